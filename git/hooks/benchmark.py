@@ -0,0 +1,457 @@
+#!/usr/bin/env python3
+
+# Performance benchmarks for the pre-commit hook.  These are not run as
+# part of test.py; run them by hand when changing the rules or the
+# scanning code and compare against the previous numbers.  The repo
+# benchmark appends its results to benchmark-results.jsonl so
+# regressions show up against earlier runs.
+
+import argparse
+import contextlib
+import gzip
+import io
+import json
+import os
+import platform
+import random
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import precommit
+
+
+# Pieces used to build synthetic but realistic looking paths
+path_prefixes = [
+    '',
+    'src/',
+    'src/odb/test/',
+    'src/sta/search/',
+    'tools/OpenROAD/src/drt/src/',
+    'tools/OpenROAD/test/',
+    'flow/designs/asap7/gcd/',
+    'flow/platforms/nangate45/lib/',
+    'flow/platforms/asap7/lib/',
+    'flow/platforms/gf12/',
+    'flow/scripts/',
+    'flow/util/',
+    'docs/user/',
+    'third-party/abc/src/base/',
+]
+
+path_stems = [
+    'README', 'Makefile', 'config', 'floorplan', 'dbNetwork', 'gcd',
+    'aes_cipher_top', 'sky130hd_tt', 'tsmc65lp', 'sc9mcpp84', 'ibex_core',
+    'macros', 'wrappers', 'test_params', 'CMakeLists', 'cln28ht',
+]
+
+path_suffixes = [
+    '.md', '.cc', '.h', '.tcl', '.py', '.v', '.lib', '.lib.gz', '.lef',
+    '.def', '.gds', '.mk', '.txt', '.json', '.ok', '.png', '',
+]
+
+
+def synthetic_paths(count, seed=0):
+    'Generate count paths drawn from the pieces above'
+    rng = random.Random(seed)
+    paths = []
+    for i in range(count):
+        depth = rng.randint(0, 3)
+        dirs = ''.join('d{}/'.format(rng.randint(0, 99)) for _ in range(depth))
+        paths.append('{}{}{}{}'.format(rng.choice(path_prefixes),
+                                       dirs,
+                                       rng.choice(path_stems),
+                                       rng.choice(path_suffixes)))
+    return paths
+
+
+def legacy_match(patterns, name):
+    'The original per-pattern loop, kept for comparison'
+    for pattern in patterns:
+        if re.search(pattern, name, re.IGNORECASE):
+            return pattern
+    return None
+
+
+def legacy_classify(name):
+    blocked_by = legacy_match(precommit.blocked_path_patterns, name)
+    allowed_by = None
+    if blocked_by is not None:
+        allowed_by = legacy_match(precommit.allowed_path_patterns, name)
+    skip = legacy_match(precommit.skip_content_patterns, name)
+    return (blocked_by, allowed_by), skip
+
+
+def timed(label, func, items):
+    start = time.perf_counter()
+    results = [func(item) for item in items]
+    elapsed = time.perf_counter() - start
+    print('{:<12} {:8.3f} s  {:10.0f} paths/s'.format(label, elapsed,
+                                                     len(items) / elapsed))
+    return results, elapsed
+
+
+def bench_paths(args):
+    paths = synthetic_paths(args.paths)
+    print('Classifying {} synthetic paths'.format(len(paths)))
+    legacy, legacy_time = timed('legacy', legacy_classify, paths)
+    engine, engine_time = timed('engine', precommit.classify_path, paths)
+    if legacy != engine:
+        for name, old, new in zip(paths, legacy, engine):
+            if old != new:
+                raise SystemExit('Mismatch on {}: {} vs {}'.format(name,
+                                                                   old, new))
+    print('speedup      {:8.1f}x'.format(legacy_time / engine_time))
+
+
+# Words for synthetic file content.  None are blocked or contain any
+# of the literals the prefilter looks for.
+content_words = [
+    'module', 'input', 'output', 'wire', 'assign', 'for', 'int', 'i',
+    '=', '0;', '{', '}', 'return', 'value', '//', 'sky130', 'nangate45',
+    'cell', 'pin', 'timing', 'capacitance', '0.0123', '1.5', 'rise',
+    'fall', 'library', 'the', 'a', 'of',
+]
+
+# Words that are not blocked but do contain a literal, used for the
+# worst case text where the prefilter hits on most lines
+near_miss_words = [
+    'param', 'help', 'alpha', 'gf180mcu', 'intelligent', 'verification',
+    'schedule',
+]
+
+
+def synthetic_text(megabytes, words=content_words, seed=0):
+    'Generate about megabytes of text made of lines of words'
+    rng = random.Random(seed)
+    lines = []
+    size = 0
+    while size < megabytes * 1024 * 1024:
+        line = ' '.join(rng.choice(words)
+                        for _ in range(rng.randint(1, 15))) + '\n'
+        lines.append(line)
+        size += len(line)
+    return ''.join(lines)
+
+
+def legacy_scan(data):
+    'The original decode and per-line re.search loop, kept for comparison'
+    text = io.TextIOWrapper(io.BytesIO(data), encoding='utf-8',
+                            errors='replace')
+    for cnt, line in enumerate(text.readlines()):
+        if re.search(precommit.block_content_patterns, line):
+            return cnt + 1, line
+    return None
+
+
+def window_scan(data):
+    'A decode and window scan with no literal prefilter'
+    return precommit.block_content_patterns.search(data.decode('utf-8'))
+
+
+def prefilter_scan(data):
+    return precommit.find_blocked_content(io.BytesIO(data))
+
+
+def bench_scan(args):
+    bench_scan_text('plain', synthetic_text(args.scan_mb))
+    bench_scan_text('near miss', synthetic_text(args.scan_mb,
+                                                content_words + near_miss_words))
+
+
+def bench_scan_text(kind, text):
+    text = text.encode()
+    megabytes = len(text) / (1024 * 1024)
+    print('Scanning {:.1f} MB of {} synthetic text'.format(megabytes, kind))
+    times = {}
+    for label, func in (('per-line', legacy_scan),
+                        ('regex', window_scan),
+                        ('prefilter', prefilter_scan)):
+        start = time.perf_counter()
+        found = func(text)
+        times[label] = time.perf_counter() - start
+        if found:
+            raise SystemExit('{} unexpectedly matched: {}'.format(label, found))
+        print('{:<12} {:8.3f} s  {:8.1f} MB/s'.format(label, times[label],
+                                                     megabytes / times[label]))
+    print('speedup      {:8.1f}x'.format(times['per-line'] / times['prefilter']))
+
+
+def git(*command, cwd=None):
+    subprocess.run(('git', '-c', 'user.name=benchmark',
+                    '-c', 'user.email=benchmark@example.com') + command,
+                   cwd=cwd, stdout=subprocess.DEVNULL, check=True)
+
+
+def write_text(path, megabytes, rng, compress=False):
+    'Write about megabytes of clean synthetic text to path'
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    size = int(megabytes * 1024 * 1024)
+    lines = []
+    while size > 0:
+        line = ' '.join(rng.choice(content_words)
+                        for _ in range(rng.randint(1, 15))) + '\n'
+        lines.append(line)
+        size -= len(line)
+    data = ''.join(lines).encode()
+    with (gzip.open if compress else open)(path, 'wb') as f:
+        f.write(data)
+
+
+def repo_shape(args):
+    'The shape of the synthetic repo, saved with the results'
+    return {
+        'small_files': args.repo_files,
+        'small_kb': args.small_kb,
+        'huge_files': args.huge_files,
+        'huge_mb': args.huge_mb,
+        'gz_files': args.gz_files,
+        'deep_files': args.deep_files,
+        'depth': args.depth,
+    }
+
+
+def make_repo(top, shape, seed=0):
+    """Create a git repo at top with one commit of clean files of the
+    given shape: many small sources, a few huge .lib files, gzipped
+    .lib.gz files and deep flow/platforms trees.  Every path is allowed
+    so the hook passes."""
+    rng = random.Random(seed)
+    git('init', '-q', top)
+    for i in range(shape['small_files']):
+        write_text(os.path.join(top, 'src', 'mod{}'.format(i % 100),
+                                'file{}.cc'.format(i)),
+                   shape['small_kb'] / 1024, rng)
+    for i in range(shape['huge_files']):
+        write_text(os.path.join(top, 'flow/platforms/nangate45/lib',
+                                'huge{}.lib'.format(i)),
+                   shape['huge_mb'], rng)
+    for i in range(shape['gz_files']):
+        write_text(os.path.join(top, 'flow/platforms/sky130hd/lib',
+                                'cells{}.lib.gz'.format(i)),
+                   0.25, rng, compress=True)
+    for i in range(shape['deep_files']):
+        dirs = ['d{}'.format(rng.randint(0, 3)) for _ in range(shape['depth'])]
+        write_text(os.path.join(top, 'flow/platforms/asap7', *dirs,
+                                'deep{}.v'.format(i)),
+                   shape['small_kb'] / 1024, rng)
+    git('add', '-A', cwd=top)
+    git('commit', '-q', '-m', 'Synthetic repo', cwd=top)
+
+
+def stage_changes(top, seed=1):
+    """Stage a diff right at the hook's limits: file_add_limit new files
+    and file_change_limit changed ones"""
+    rng = random.Random(seed)
+    for i in range(precommit.file_add_limit):
+        write_text(os.path.join(top, 'src/new', 'new{}.cc'.format(i)),
+                   0.01, rng)
+    for i in range(precommit.file_change_limit):
+        path = os.path.join(top, 'src', 'mod{}'.format(i % 100),
+                            'file{}.cc'.format(i))
+        with open(path, 'a') as f:
+            f.write('// changed\n')
+    git('add', '-A', cwd=top)
+
+
+def time_main(top, argv, repeat):
+    """Time the hook's main() on argv in top after one untimed run to
+    warm the caches.  Returns the best wall time over repeat runs and
+    the --stats report from that run."""
+    best = None
+    cwd = os.getcwd()
+    try:
+        os.chdir(top)
+        with contextlib.redirect_stdout(io.StringIO()):
+            precommit.main(precommit.parse_args(argv))
+        for _ in range(repeat):
+            os.chdir(top)
+            precommit.run_stats = precommit.Stats()
+            precommit.run_stats.enabled = True
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                precommit.main(precommit.parse_args(argv))
+            elapsed = time.perf_counter() - start
+            if best is None or elapsed < best[0]:
+                best = elapsed, precommit.run_stats.report()
+    finally:
+        os.chdir(cwd)
+    return best
+
+
+def bench_repo(args):
+    shape = repo_shape(args)
+    top = args.repo_dir or tempfile.mkdtemp(prefix='precommit-bench-')
+    try:
+        if not os.path.isdir(os.path.join(top, '.git')):
+            print('Creating synthetic repo in {}'.format(top))
+            make_repo(top, shape)
+            stage_changes(top)
+        results = {}
+        for label, argv in (('staged', ['--no-cache']),
+                            ('staged cached', []),
+                            ('local full', ['--local', '--full']),
+                            ('local', ['--local']),
+                            ('local jobs', ['--local', '--full',
+                                            '--jobs', '0'])):
+            elapsed, report = time_main(top, argv, args.repeat)
+            results[label] = {
+                'seconds': elapsed,
+                'phases': report['seconds'],
+                'subprocesses': report.get('subprocesses', 0),
+                'files_scanned': report['files_scanned'],
+                'bytes_scanned': report['bytes_scanned'],
+            }
+            print('{:<14} {:8.3f} s  {:6d} files  {:8.1f} MB'.format(
+                label, elapsed, report['files_scanned'],
+                report['bytes_scanned'] / (1024 * 1024)))
+    finally:
+        if not args.repo_dir:
+            shutil.rmtree(top)
+    if args.results:
+        save_results(args.results, shape, results)
+
+
+def hook_version():
+    'The commit of this checkout, to tell results apart'
+    r = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'],
+                       cwd=os.path.dirname(os.path.abspath(__file__)),
+                       stdout=subprocess.PIPE, encoding='utf-8')
+    return r.stdout.strip() or None
+
+
+def save_results(path, shape, results):
+    """Append a run to the JSON lines history in path and compare it
+    with the last run of the same shape"""
+    previous = None
+    try:
+        with open(path) as f:
+            for line in f:
+                entry = json.loads(line)
+                if entry['shape'] == shape:
+                    previous = entry
+    except OSError:
+        pass
+    entry = {
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'version': hook_version(),
+        'python': platform.python_version(),
+        'host': platform.node(),
+        'shape': shape,
+        'results': results,
+    }
+    with open(path, 'a') as f:
+        f.write(json.dumps(entry) + '\n')
+    if previous:
+        print('Compared with {} ({}):'.format(previous['version'],
+                                              previous['time']))
+        for label, result in results.items():
+            old = previous['results'].get(label)
+            if old:
+                print('{:<14} {:+7.1f}%'.format(
+                    label, 100 * (result['seconds'] / old['seconds'] - 1)))
+
+
+hook_path = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                         'pre-commit.py')
+
+
+def run_time(command):
+    'Wall time in seconds to run command in a fresh process'
+    start = time.perf_counter()
+    subprocess.run(command, stdout=subprocess.DEVNULL, check=True)
+    return time.perf_counter() - start
+
+
+def import_times():
+    """Run the hook script as git does with -X importtime and return
+    {module: (self us, cumulative us)}"""
+    r = subprocess.run([sys.executable, '-X', 'importtime', hook_path,
+                        '--help'],
+                       stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                       encoding='utf-8', check=True)
+    times = {}
+    for line in r.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        own, cumulative, module = line[len('import time:'):].split('|')
+        times[module.strip()] = int(own), int(cumulative)
+    return times
+
+
+def median(values):
+    return sorted(values)[len(values) // 2]
+
+
+def bench_startup(args):
+    """Time running the hook script with --help in a fresh interpreter,
+    which is how git runs it, against starting Python alone.  The script
+    is only a launcher and the hook is loaded from the cached bytecode of
+    precommit.py, so this shows whether that cache is being used."""
+    if os.environ.get('PYTHONDONTWRITEBYTECODE'):
+        print('Bytecode caching is off so precommit.py is compiled every run')
+    python = median([run_time([sys.executable, '-c', 'pass'])
+                     for _ in range(args.startup)])
+    hook = median([run_time([sys.executable, hook_path, '--help'])
+                   for _ in range(args.startup)])
+    print('Running the hook (median of {}): {:.1f} ms, {:.1f} ms more than'
+          ' starting Python'.format(args.startup, hook * 1000,
+                                    (hook - python) * 1000))
+    runs = [import_times() for _ in range(args.startup)]
+    module = median([run['precommit'] for run in runs])
+    print('  importing precommit: {:.1f} ms, {:.1f} ms in the hook itself'
+          .format(module[1] / 1000, module[0] / 1000))
+    slowest = sorted(runs[-1].items(), key=lambda item: -item[1][0])[:8]
+    for module, (own, cumulative) in slowest:
+        print('  {:<30} {:6.1f} ms'.format(module, own / 1000))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Pre-commit hook benchmarks')
+    parser.add_argument('--paths', type=int, default=1000000,
+                        help='number of synthetic paths to classify')
+    parser.add_argument('--scan-mb', type=int, default=64,
+                        help='megabytes of synthetic text to scan')
+    parser.add_argument('--startup', type=int, default=10,
+                        help='fresh interpreters to time running the hook'
+                        ' script in')
+    parser.add_argument('--repo-files', type=int, default=5000,
+                        help='small source files in the synthetic repo')
+    parser.add_argument('--small-kb', type=float, default=2,
+                        help='size of each small file')
+    parser.add_argument('--huge-files', type=int, default=2,
+                        help='huge .lib files in the synthetic repo')
+    parser.add_argument('--huge-mb', type=float, default=10,
+                        help='size of each huge file (keep it under'
+                        ' md5_whitelist_cutoff)')
+    parser.add_argument('--gz-files', type=int, default=20,
+                        help='.lib.gz files in the synthetic repo')
+    parser.add_argument('--deep-files', type=int, default=500,
+                        help='files in the deep flow/platforms tree')
+    parser.add_argument('--depth', type=int, default=8,
+                        help='directory depth of the deep tree')
+    parser.add_argument('--repo-dir',
+                        help='create (or reuse) the synthetic repo here and'
+                        ' keep it rather than using a temporary one')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='runs of each hook mode, the best is kept')
+    parser.add_argument('--results', default='benchmark-results.jsonl',
+                        help='JSON lines file the repo results are appended'
+                        ' to and compared against (empty to not save)')
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.startup:
+        bench_startup(args)
+    if args.paths:
+        bench_paths(args)
+    if args.scan_mb:
+        bench_scan(args)
+    if args.repo_files:
+        bench_repo(args)
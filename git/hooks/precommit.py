@@ -0,0 +1,2624 @@
+import argparse
+import collections
+import contextlib
+import heapq
+import io
+import os
+import re
+import stat
+import subprocess
+import sys
+import time
+
+# The pre-commit security hook.  pre-commit.py is the script git runs
+# and it only imports this, so this is compiled once and loaded from
+# its cached bytecode rather than compiled again every commit.
+#
+# Modules that only some runs need (concurrent.futures, hashlib, json,
+# socket, zlib) are imported where they are used so every commit
+# doesn't pay to load them.  Check with:
+# python3 -X importtime pre-commit.py --help
+
+print("Running pre-commit security hook....")
+
+# Limits for rules
+file_add_limit    = 20
+file_change_limit = 50
+
+# The following patterns are regular expressions and are matched
+# case-insensitive.  They are matched anywhere with the string
+# and can have leading or trailing characters and still match.
+
+# Blocked paths (unless allowed below).
+blocked_path_patterns = [
+    r"flow/",
+    r"\.gds",
+    r"\.t?lef",
+    r"\.def$",
+    r"\.cdl",
+    r"\.cal",
+    r"\.v$",
+    r"\.db",
+    r"\.lib",
+    r"\.t?gz",
+    r"\.tar",
+    r"tsmc",
+    r"intel",
+    r"rapidus",
+    r"gf\d+",
+    r"ca\d+",    # ARM cores
+    r"\d+lp",    # Invecas
+    r"sc\d+",    # ARM/Rapidus-style names
+    r"sch\d+",   # ARM-style names
+    r"cmos\d+",  # Rapidus-style names
+    r"cln\d+",   # eg CLN65 (for ARM)
+    r"scc9gena", # Sky90 library
+    r"sky90",    # Sky90
+    r"b15",      # Intel
+    r"prtf_"     # PnR Tech File
+]
+
+# Allowed paths are exceptions to blocked paths above.
+allowed_path_patterns = [
+    r"^\.git/",
+    r"^\.gitignore",
+    r"^flow/\.gitignore",
+    r"^flow/designs",
+    r"^flow/docs",
+    r"^flow/platforms/nangate45",
+    r"^flow/platforms/sky130",
+    r"^flow/platforms/asap7",
+    r"^flow/platforms/gf180",
+    r"^flow/platforms/ihp-sg13g2",
+    r"^flow/platforms/ihp-sg13cmos5l",
+    r"^flow/platforms/gt2n",
+    r"^flow/platforms/common",
+    r"^flow/scripts",
+    r"^flow/settings.mk",
+    r"^flow/test",
+    r"^flow/tutorials",
+    r"^flow/util",
+    r"^flow/README.md$",
+    r"^flow/Makefile$",
+    r"^flow/\.bazelversion$",
+    r"^flow/\.bazelrc$",
+    r"^flow/MODULE\.bazel$",
+    r"^flow/MODULE\.bazel\.lock$",
+    r"^flow/WORKSPACE\.bazel$",
+    r"^flow/BUILD$",
+    r"^flow/BUILD\.bazel$",
+    r"^((tools/OpenROAD/)?src/odb/)?src/[ld]ef(56)?/TEST",
+    r"^((tools/OpenROAD/)?src/odb/)?test",
+    r"^(tools/OpenROAD/)?src/ant/test",
+    r"^(tools/OpenROAD/)?src/cgt/test",
+    r"^(tools/OpenROAD/)?src/cts/test",
+    r"^(tools/OpenROAD/)?src/cut/test",
+    r"^(tools/OpenROAD/)?src/dbSta/test",
+    r"^(tools/OpenROAD/)?src/dft/test",
+    r"^(tools/OpenROAD/)?src/dpl/test",
+    r"^(tools/OpenROAD/)?src/dpo/test",
+    r"^(tools/OpenROAD/)?src/drt/test",
+    r"^(tools/OpenROAD/)?src/est/test",
+    r"^(tools/OpenROAD/)?src/exa/test",
+    r"^(tools/OpenROAD/)?src/fin/test",
+    r"^(tools/OpenROAD/)?src/gpl/test",
+    r"^(tools/OpenROAD/)?src/gui/test",
+    r"^(tools/OpenROAD/)?src/grt/test",
+    r"^(tools/OpenROAD/)?src/ifp/test",
+    r"^(tools/OpenROAD/)?src/mpl/test",
+    r"^(tools/OpenROAD/)?src/pad/test",
+    r"^(tools/OpenROAD/)?src/par/examples",
+    r"^(tools/OpenROAD/)?src/par/test",
+    r"^(tools/OpenROAD/)?src/pdn/test",
+    r"^(tools/OpenROAD/)?src/pdr/test",
+    r"^(tools/OpenROAD/)?src/ppl/test",
+    r"^(tools/OpenROAD/)?src/psm/test",
+    r"^(tools/OpenROAD/)?src/psm/test",
+    r"^(tools/OpenROAD/)?src/ram/test",
+    r"^(tools/OpenROAD/)?src/rcx/test",
+    r"^(tools/OpenROAD/)?src/rmp/test",
+    r"^(tools/OpenROAD/)?src/rsz/test",
+    r"^(?:tools/OpenROAD/)?(?:src/sta/)?examples",
+    r"^(?:tools/OpenROAD/)?(?:src/sta/)?test",
+    r"^(?:tools/OpenROAD/)?(?:src/sta/)?dcalc/test",
+    r"^(?:tools/OpenROAD/)?(?:src/sta/)?graph/test",
+    r"^(?:tools/OpenROAD/)?(?:src/sta/)?liberty/test",
+    r"^(?:tools/OpenROAD/)?(?:src/sta/)?network/test",
+    r"^(?:tools/OpenROAD/)?(?:src/sta/)?parasitics/test",
+    r"^(?:tools/OpenROAD/)?(?:src/sta/)?power/test",
+    r"^(?:tools/OpenROAD/)?(?:src/sta/)?sdc/test",
+    r"^(?:tools/OpenROAD/)?(?:src/sta/)?sdf/test",
+    r"^(?:tools/OpenROAD/)?(?:src/sta/)?search/test",
+    r"^(?:tools/OpenROAD/)?(?:src/sta/)?spice/test",
+    r"^(?:tools/OpenROAD/)?(?:src/sta/)?util/test",
+    r"^(?:tools/OpenROAD/)?(?:src/sta/)?verilog/test",
+    r"^(tools/OpenROAD/)?src/stt/test",
+    r"^(tools/OpenROAD/)?src/syn/src/flow",
+    r"^(tools/OpenROAD/)?src/syn/test",
+    r"^(tools/OpenROAD/)?src/tap/test",
+    r"^(tools/OpenROAD/)?src/upf/test",
+    r"^(tools/OpenROAD/)?src/web/test",
+    r"^(tools/OpenROAD/)?test",
+    r"^(tools/OpenROAD/)?third-party/abc",
+    r"^(tools/OpenROAD/)?third-party/slang-elab",
+    r"^tools/yosys",
+    
+    # OpenSTA
+    r"^examples",
+    r"^(tools/OpenROAD/src/OpenSTA)?dcalc/test",
+    r"^(tools/OpenROAD/src/OpenSTA)?graph/test",
+    r"^(tools/OpenROAD/src/OpenSTA)?liberty/test",
+    r"^(tools/OpenROAD/src/OpenSTA)?network/test",
+    r"^(tools/OpenROAD/src/OpenSTA)?parasitics/test",
+    r"^(tools/OpenROAD/src/OpenSTA)?power/test",
+    r"^(tools/OpenROAD/src/OpenSTA)?sdc/test",
+    r"^(tools/OpenROAD/src/OpenSTA)?sdf/test",
+    r"^(tools/OpenROAD/src/OpenSTA)?search/test",
+    r"^(tools/OpenROAD/src/OpenSTA)?spice/test",
+    r"^(tools/OpenROAD/src/OpenSTA)?util/test",
+    r"^(tools/OpenROAD/src/OpenSTA)?verilog/test",
+]
+
+# Files may not contain these patterns in their content anywhere (not
+# just the changed portion).  All staged files are checked, even
+# "allowed" files - there should still be no bad content in allowed
+# files.
+#
+# Uses compiled expression for performance.
+block_content_patterns = \
+    re.compile(r"""
+       gf(?!(180|018))\d\d+ # Disallow gf12 but allow gf180
+     | tsmc       # eg tsmc65lp
+     | \d+lp      # eg 12LP (for Invecus)
+     | \barm\b    # eg ARM
+     | cln\d+     # eg CLN65 (for ARM)
+     | sch\d+     # ARM-style
+     | cypress    # eg Cypress Semiconductor
+     | rapidus    # eg Rapidus
+     | intel(?!l) # eg Intel (but not intelligent)
+     | verific\b  # eg Verific (but not verification)
+    """, re.VERBOSE | re.IGNORECASE)
+
+# Every match of block_content_patterns contains one of these literals
+# (matched case-insensitive) so text without any of them can't match.
+# Keep them in step with the patterns above.
+block_content_literals = [
+    'gf',
+    'tsmc',
+    'lp',
+    'arm',
+    'cln',
+    'sch',
+    'cypress',
+    'rapidus',
+    'intel',
+    'verific',
+]
+
+# Files to skip content checks on
+skip_content_patterns = [
+    r"\.gif$",
+    r"\.jpg$",
+    r"\.png$",
+    r"\.webp$",
+    r"\.pdf$",
+    r"\.gif$",
+    r"\.odt$",
+    r"\.xlsx$",
+    r"\.ipynb$",
+    r"\.vcd$",
+    r"\.a$",
+    r"^src/sta/app/sta$",
+    r"\.dat$",  # eg POWV9.dat
+    r"\.gds(\.orig)?$",
+    r"^README.md$",
+    r"^flake.lock$",
+    r"^(tools/OpenROAD/)?docs/index.(md|rst)$",
+    r"^(tools/OpenROAD/)?docs/user/GettingStarted.(md|rst)$",
+    r"^flow/README.md$",
+    r"^flow/platforms/asap7/README.md$",
+    r"^(tools/OpenROAD/)?bazel/openmp/kmp_i18n_default.inc",
+    r"^(tools/OpenROAD/)?bazel/openmp/kmp_config.h",
+    r"^(tools/OpenROAD/)?src/drt/src", # until cleaned up
+    r"^(tools/OpenROAD/)?src/drt/cmake", # .../intel/vtune
+    r"^(tools/OpenROAD/)?src/gpl/README.md$",
+    r"^(tools/OpenROAD/)?src/syn/BUILD$",
+    r"^(tools/OpenROAD/)?src/syn/src/CMakeLists.txt$",
+    r"^(tools/OpenROAD/)?src/syn/src/synthesis.cpp$",
+    r"^(tools/OpenROAD/)?src/syn/src/verific/CMakeLists.txt$",
+    r"^(tools/OpenROAD/)?src/syn/src/verific/driver.cc$",
+    r"^(tools/OpenROAD/)?src/web/pnpm-lock.yaml$",
+    r"^(tools/OpenROAD/)?src/web/test/pnpm-lock.yaml$",
+    r"^(?:tools/OpenROAD/)?(?:src/sta/)?README.md$",
+    r"^(?:tools/OpenROAD/)?(?:src/sta/)?examples/gcd_sky130hd.vcd.gz$",
+    r"^(?:tools/OpenROAD/)?(?:src/sta/)?search/Sta.cc$",
+    r"^(tools/OpenROAD/)?third-party/abc",
+    r"^(tools/OpenROAD/)?third-party/slang-elab",
+    r"^(tools/OpenROAD/)?MODULE.bazel",
+    r"^(flow/platforms/)?sky130hd/chameleon",
+    r"^(flow/designs/)?sky130hd/chameleon",
+    r"^tools/yosys/",
+    r"^\.git/",
+    r"^build_openroad.sh$",
+    r"^docker/Dockerfile.builder$",
+    r"^flow/designs/rapidus2hp/.*/test/test_params.py$",
+    r"^flow/designs/rapidus2hp/utils/run_tests.sh$",
+    r"^flow/designs/rapidus2hp/utils/.*.py$",
+    r"^flow/designs/.*/metadata.*-ok.json$",
+    r"^flow/designs/.*/config.mk$",
+    r"^flow/designs/.*/config_mpl2.mk$",
+    r"^flow/designs/.*/config_hier.mk$",
+    r"^flow/designs/.*/config_synth.mk$",
+    r"^flow/designs/.*/wrappers.tcl$",
+    r"^flow/designs/.*/macros.v$",
+    r"^flow/designs/src/.*\.sv2v\.v$",
+    r"^flow/designs/.gitignore",
+    r"^flow/designs/rapidus2hp/README.md$",
+    r"^flow/designs/rapidus2hp/ibex/rapidus2hp_ibex_tune.yaml$",
+    r"^flow/scripts/add_routing_blk.tcl$",
+    r"^flow/scripts/floorplan.tcl$",
+    r"^flow/scripts/synth_preamble.tcl",
+    r"^flow/test/core_tests.sh$",
+    r"^flow/test/smoke.sh$",
+    r"^flow/util/cell-veneer/wrap_stdcells.tcl",
+    r"^flow/util/cell-veneer/lefdef.tcl",
+    r"^flow/util/calBuffer.py",
+    r"^flow/util/calPath.py",
+    r"^flow/util/run.sh",
+    r"^flow/Makefile$",
+]
+
+# For large files we keep an md5 hash of the contents to avoid the expense
+# of scanning them with the block_content_patterns regex which is slow.
+md5_whitelist = set((
+    # OpenROAD
+    'e68d7e44ebb11a713753cc3b4127fca8', # test/sky130hs/sky130_fd_sc_hs__tt_025C_1v80.lib
+    '63f66e54f4d04b374e60756388e9c116', # test/sky130hs/sky130_fd_sc_hs__tt_025C_1v80.lib for pdn repair channel
+    '7a1179ac0a93781ffdb07090ba8cf260', # test/sky130hd/sky130_fd_sc_hd__ff_n40C_1v95.lib
+    'b29ffb80bf70e61b7064796c8702eb45', # src/rcx/test/generate_pattern.spefok
+    '0f1a956ff22a003be485a678b3877fd5', # src/rcx/test/generate_pattern.defok (old)
+    '4a36906520787cf238738a3cb6f46504', # src/rcx/test/generate_pattern.defok
+    '303c92cc0ec313c0630d84f94313f6ac', # src/rcx/test/generate_pattern.vok (old)
+    '119372cf939e41b7ddf24fb5758a750d', # src/rcx/test/generate_pattern.vok
+    'e9e4daefed9083224832fbe262d0ea5d', # src/gpl/test/macro03.def
+    # old
+    'a18ab004e747067cfd2a3569becb9799', # src/gpl/test/large01.defok
+    'd80867b517b2448febf60860bf663374', # src/gpl/test/large01.defok
+    '1129d48daf4119864762d3afae44700c', # src/gpl/test/large01.def
+    '34176aa8aa0dac9e2ec35dc0adf21111', # src/gpl/test/large02.defok
+    'f66e8a49010debd35833f159dad1d5c8', # src/gpl/test/large02.defok
+    '8ce7ee36cde5a01fca6b800a4090c5dc', # src/gpl/test/large02.def
+    '5271a85ed1a4a7eaaf7b6a582a4b9303', # src/gpl/test/medium03.defok
+    'b49d16b2ca57c7dfe2e690bf1b4c0d57', # src/gpl/test/medium03.defok
+    '965c8a3c3b424708583d48ee1f9ad931', # src/gpl/test/medium03.def
+    '6725a64db47a2c4f3a9eba59c149ef66', # src/gpl/test/medium04.def
+    '988deaa7d5f05ea628b62c7f19791b0a', # src/gpl/test/medium04.defok
+    'be58f86f1b0698cb134dd6801629c137', # src/gpl/test/medium04.defok
+    '13bd6497ece4785e873ff699eef79f41', # src/gpl/test/medium04.defok
+    # updated
+    '48092fdbd5e37998adaef2115871a98a', # src/gpl/test/large01.defok
+    '9ec56d19ec70f5574c77d0f6c306ded1', # src/gpl/test/large01.defok (newer)
+    '89c746fad8d8be15d8be15af595cd981', # src/gpl/test/large01.defok (newer2)
+    '6ae28882bbb78f96312bca05c96639b3', # src/gpl/test/large01.defok (newer3)
+    'b03c45859946dcdf44f1ab859c7b9329', # src/gpl/test/large01.defok (newer4)
+    '02f47f3b32749a009a32d912baf4bd4c', # src/gpl/test/large02.defok
+    '61bc5fe661f07ec1916bec73174d8352', # src/gpl/test/large02.defok (newer)
+    'ca9aa1d30e266785d6eaf479210efb08', # src/gpl/test/large02.defok (newer2)
+    'f9bb7af46c650ba0526edbd232a13990', # src/gpl/test/large02.defok (newer3)
+    '6b096ad64ff5d9abd439cf1e0fb5d647', # src/gpl/test/macro03.defok
+    '95fa4b1e2e9c42988c686d65dccefa64', # src/gpl/test/macro03.defok
+    'c620676d83b1471dfd0c4f81d75cdf57', # src/gpl/test/macro03.defok (newer)
+    '7fcd444afa171027a2173fdb47eb559e', # src/gpl/test/macro03.defok (newer2)
+    'c1997dcf02807f3f73be35106fbd6de5', # src/gpl/test/medium03.defok
+    'ef74164a008f3750d39096d2eadc0265', # src/gpl/test/medium03.defok (newer)
+    '365fb4b84cf6ff9bbb96ce24270ad008', # src/gpl/test/medium04.defok
+    '9a16d85d525202df02bece2e47df6deb', # src/gpl/test/medium04.defok (newer)
+    'be58f86f1b0698cb134dd6801629c137', # src/gpl/test/medium04.defok (newer2)
+
+    '35ddd551d88d1e491c939c6fc551e625', # src/par/examples/embedding-aware-partitioning/sparcT1_chip2.hgr
+    'bc2394711bc7c8266d24e6bb43a0c061', # src/par/examples/timing-aware-partitioning/ariane.v
+
+    '338775fa5ff59a87225454f9e3fb7d33', # src/pdn/test/soc_bsg_black_parrot_nangate45.defok
+    '11c59e5f428eb51deee617620ed585bf', # src/pdn/test/soc_bsg_black_parrot_nangate45.pad_offset.defok
+    '0ade01392aacde0bc812c1d00d8af487', # src/pdn/test/pads_black_parrot.defok (old)
+    '21851e9df9ecc6764e3f9067d979dc1e', # src/pdn/test/pads_black_parrot.defok (new)
+    'e60445d5a3dcb3efd2e003149a5e3347', # src/pdn/test/pads_black_parrot_flipchip.defok (old)
+    '543f979cbf751130966023008ae832bd', # src/pdn/test/pads_black_parrot_flipchip.defok (new)
+    'a080f178c55b63accb6f2c5245625221', # src/psm/test/sky130hd_data/zerosoc_pads.def
+    'b31c5d6f621f1a227736e55591553393', # updated of above zerosoc_pads.def
+
+    # OpenROAD-flow-scripts
+    '2d74c6a29a8cd18536ec332accfa76d1', # flow/platforms/sky130ram/sky130_sram_1rw1r_80x64_8/sky130_sram_1rw1r_80x64_8.lef
+    '17d9ce812cf1b635c392750ac0ec69c3', # flow/platforms/sky130ram/sky130_sram_1rw1r_128x256_8/sky130_sram_1rw1r_128x256_8.lef
+    '3d196f7e32be942538db4021fdd72927', # flow/platforms/sky130ram/sky130_sram_1rw1r_64x256_8/sky130_sram_1rw1r_64x256_8.lef
+    '3f2e7428931bc5797727ddcd44ecb9c7', # flow/platforms/sky130hs/lib/sky130_fd_sc_hs__tt_100C_1v80.lib
+    '3541e22e1ed76cddd2b104c8938b70e7', # flow/platforms/asap7/lib/asap7sc7p5t_OA_SLVT_SS_nldm_201020.lib
+    '6756222941e7d68d3c9cb90984c1bf83', # flow/platforms/asap7/lib/asap7sc7p5t_AO_SLVT_TT_nldm_201020.lib
+    'a3caea338431c290089ac110a9839f62', # flow/platforms/asap7/lib/asap7sc7p5t_AO_SRAM_FF_nldm_201020.lib
+    '557414126cb483fa25a66e3d17f76fe1', # flow/platforms/asap7/lib/asap7sc7p5t_OA_RVT_SS_nldm_201020.lib
+    '421d20d1f12945d4979ae1c78da9aa2e', # flow/platforms/asap7/lib/asap7sc7p5t_AO_RVT_SS_nldm_201020.lib
+    '35dc584334ba616972838ab7b4eadaea', # flow/platforms/asap7/lib/asap7sc7p5t_AO_LVT_TT_nldm_201020.lib
+    '9e56e6d9790f1cd904914b41c6c0faad', # flow/platforms/asap7/lib/asap7sc7p5t_AO_RVT_FF_nldm_201020.lib
+    'f514f36645928a32a7fbd1a232420831', # flow/platforms/asap7/lib/asap7sc7p5t_AO_SRAM_SS_nldm_201020.lib
+    '1d0a4b12b973072e2b8ac0c2d80d2a08', # flow/platforms/asap7/lib/asap7sc7p5t_OA_RVT_FF_nldm_201020.lib
+    'cb552f32d836cee62e8fd8758ace59bc', # flow/platforms/asap7/lib/asap7sc7p5t_OA_SRAM_TT_nldm_201020.lib
+    'a8bb2a328dfaede8e653588dc9b1c062', # flow/platforms/asap7/lib/asap7sc7p5t_OA_LVT_TT_nldm_201020.lib
+    'c801c520546a03e5fca703e6efaf4d44', # flow/platforms/asap7/lib/asap7sc7p5t_OA_SLVT_FF_nldm_201020.lib
+    'c0160f0735003cdda388782b7d3c2956', # flow/platforms/asap7/lib/asap7sc7p5t_AO_RVT_TT_nldm_201020.lib
+    'a36d097e6c3d273f91c4ff4645ebd4a1', # flow/platforms/asap7/lib/asap7sc7p5t_AO_LVT_FF_nldm_201020.lib
+    '353c6442fd0a631fe92dd1b4b53c7a57', # flow/platforms/asap7/lib/asap7sc7p5t_OA_LVT_FF_nldm_201020.lib
+    '4aa64e2f86ac82f74fd7f85755e96de4', # flow/platforms/asap7/lib/asap7sc7p5t_OA_SLVT_TT_nldm_201020.lib
+    'b13ff982123b3ec7a3123e987a976266', # flow/platforms/asap7/lib/asap7sc7p5t_AO_SLVT_SS_nldm_201020.lib
+    'c5c12056efdf6971aca43fef7f7b93cd', # flow/platforms/asap7/lib/asap7sc7p5t_OA_RVT_TT_nldm_201020.lib
+    '73ce20b16bdd41403b3785e592dbee13', # flow/platforms/asap7/lib/asap7sc7p5t_OA_SRAM_FF_nldm_201020.lib
+    'f5b5ea21025ddec37e157b563f7f4db8', # flow/platforms/asap7/lib/asap7sc7p5t_AO_SRAM_TT_nldm_201020.lib
+    'd3cbcdde427e44edc87e7c750303b6ad', # flow/platforms/asap7/lib/asap7sc7p5t_OA_SRAM_SS_nldm_201020.lib
+    'dda503333c1948a41fd17296b8839a09', # flow/platforms/asap7/lib/asap7sc7p5t_AO_SLVT_FF_nldm_201020.lib
+    'cdd685451262808f8f77bd8040c8b230', # flow/platforms/asap7/lib/asap7sc7p5t_OA_LVT_SS_nldm_201020.lib
+    '6d1b8586754b2cdcde73695662c2ab65', # flow/platforms/asap7/lib/asap7sc7p5t_AO_LVT_SS_nldm_201020.lib
+    '87827d7810febeb69a0a19e9af520642', # flow/designs/sky130hd/microwatt/gds/Microwatt_FP_DFFRFile.gds.gz
+    '287e146444ded121d259f82dfe8f3a28', # flow/designs/sky130hd/microwatt/gds/RAM512.gds.gz
+    'cb1e9c44a755ceebeb846f33c658a0c8', # flow/designs/nangate45/mempool_tile/mempool_tile_wrap.v
+
+    'eeb17d41504b1c00c7f2dcb9068394e9', # flow/platforms/asap7/lib/asap7sc7p5t_AO_LVT_FF_nldm_211120.lib
+    'e0bf755d44fbf5bd0ab56e38eff99d30', # flow/platforms/asap7/lib/asap7sc7p5t_AO_LVT_SS_nldm_211120.lib
+    '3d34a74024fb048977a2a64d3b877ed4', # flow/platforms/asap7/lib/asap7sc7p5t_AO_LVT_TT_nldm_211120.lib
+    '4ab7811f2c051cf52e7acaab6b8f2271', # flow/platforms/asap7/lib/asap7sc7p5t_AO_RVT_FF_nldm_211120.lib
+    '40f0f11eb1cf9ed719d7a35bf02f45ed', # flow/platforms/asap7/lib/asap7sc7p5t_AO_RVT_SS_nldm_211120.lib
+    '018cca52aa26dd6b5988f602f79573cc', # flow/platforms/asap7/lib/asap7sc7p5t_AO_RVT_TT_nldm_211120.lib
+    '4686350746e96c87832a212ccc0e11d1', # flow/platforms/asap7/lib/asap7sc7p5t_AO_SLVT_FF_nldm_211120.lib
+    'f8567ed75247fdd4b2045b551f117002', # flow/platforms/asap7/lib/asap7sc7p5t_AO_SLVT_SS_nldm_211120.lib
+    'c0eb655da9d8b9065cef83fd2f9e4c41', # flow/platforms/asap7/lib/asap7sc7p5t_AO_SLVT_TT_nldm_211120.lib
+    'd2561b1cd20a0d3908ad09c3e21faaa4', # flow/platforms/asap7/lib/asap7sc7p5t_AO_SRAM_FF_nldm_211120.lib
+    'c193a820781df58232d955b497d7ea21', # flow/platforms/asap7/lib/asap7sc7p5t_AO_SRAM_SS_nldm_211120.lib
+    '86647167cc8baa250b859960f9b533b3', # flow/platforms/asap7/lib/asap7sc7p5t_AO_SRAM_TT_nldm_211120.lib
+    'afeae05e16e8dfa6e38908e09d6c8bef', # flow/platforms/asap7/lib/asap7sc7p5t_INVBUF_LVT_FF_nldm_220122.lib
+    'fca677b7a1902ce9b2ab76fe2d86e442', # flow/platforms/asap7/lib/asap7sc7p5t_INVBUF_LVT_SS_nldm_220122.lib
+    'c170651f484eded37af7b010ec201a3d', # flow/platforms/asap7/lib/asap7sc7p5t_INVBUF_LVT_TT_nldm_220122.lib
+    '584031b7f4a68c85843d3da44c67949f', # flow/platforms/asap7/lib/asap7sc7p5t_INVBUF_RVT_FF_nldm_220122.lib
+    'f750a5468f6821139ba137476a208dd7', # flow/platforms/asap7/lib/asap7sc7p5t_INVBUF_RVT_SS_nldm_220122.lib
+    'a6f01b9e832baa8758dde53d9a2fbc93', # flow/platforms/asap7/lib/asap7sc7p5t_INVBUF_RVT_TT_nldm_220122.lib
+    'dff6309638afa2d887d2943e87dd4b4e', # flow/platforms/asap7/lib/asap7sc7p5t_INVBUF_SLVT_FF_nldm_220122.lib
+    '0f3da098783edbb401f5a947d4442432', # flow/platforms/asap7/lib/asap7sc7p5t_INVBUF_SLVT_SS_nldm_220122.lib
+    '5048e252e88012afe9075684e6325f5b', # flow/platforms/asap7/lib/asap7sc7p5t_INVBUF_SLVT_TT_nldm_220122.lib
+    'dd5645097f05929e9a4ffd0ec200dbed', # flow/platforms/asap7/lib/asap7sc7p5t_INVBUF_SRAM_FF_nldm_220122.lib
+    'a95b60c08d73ffd59b6ee71bf6ca969c', # flow/platforms/asap7/lib/asap7sc7p5t_INVBUF_SRAM_SS_nldm_220122.lib
+    'e74f7e5a661aca152f1f8c3a19270e69', # flow/platforms/asap7/lib/asap7sc7p5t_INVBUF_SRAM_TT_nldm_220122.lib
+    'cc6c960e268ab3c616409b217d6b0011', # flow/platforms/asap7/lib/asap7sc7p5t_OA_LVT_FF_nldm_211120.lib
+    'c53933ff50d6e7bef5b08f339f19d6fa', # flow/platforms/asap7/lib/asap7sc7p5t_OA_LVT_SS_nldm_211120.lib
+    '8203bc5cdbda524b76bd28d35e630826', # flow/platforms/asap7/lib/asap7sc7p5t_OA_LVT_TT_nldm_211120.lib
+    'c4125f8e2f04e5941d92ab87d5567563', # flow/platforms/asap7/lib/asap7sc7p5t_OA_RVT_FF_nldm_211120.lib
+    '273f4ab932786264178704c121a9f3ea', # flow/platforms/asap7/lib/asap7sc7p5t_OA_RVT_SS_nldm_211120.lib
+    'ef8ca7b8be646b5b15ccdff776dcfa6d', # flow/platforms/asap7/lib/asap7sc7p5t_OA_RVT_TT_nldm_211120.lib
+    '411acd5b95f75cfc1405925ebd11780f', # flow/platforms/asap7/lib/asap7sc7p5t_OA_SLVT_FF_nldm_211120.lib
+    'e3807f5e91fcb915fe231d0ce60874cc', # flow/platforms/asap7/lib/asap7sc7p5t_OA_SLVT_SS_nldm_211120.lib
+    '698f21638c2040243bce6e57a0afd5ac', # flow/platforms/asap7/lib/asap7sc7p5t_OA_SLVT_TT_nldm_211120.lib
+    '71b17cbd42abf6d0d637da126e07772a', # flow/platforms/asap7/lib/asap7sc7p5t_OA_SRAM_FF_nldm_211120.lib
+    'ea7a2cd04f43ba04cb366207493b9d09', # flow/platforms/asap7/lib/asap7sc7p5t_OA_SRAM_SS_nldm_211120.lib
+    '97d9a921b9af593667db471d6b7bb885', # flow/platforms/asap7/lib/asap7sc7p5t_OA_SRAM_TT_nldm_211120.lib
+    '2b6ecf78280b0041b6043f36ae48a459', # flow/platforms/asap7/lib/asap7sc7p5t_SEQ_LVT_FF_nldm_220123.lib
+    'e94798d2fdbaa028d23cc2f6b5ef34d3', # flow/platforms/asap7/lib/asap7sc7p5t_SEQ_LVT_SS_nldm_220123.lib
+    '6c736d8c2f831822c45f38724b4ecb11', # flow/platforms/asap7/lib/asap7sc7p5t_SEQ_LVT_TT_nldm_220123.lib
+    '9ffdf5ebb0392aebaa1c976f8b3101d4', # flow/platforms/asap7/lib/asap7sc7p5t_SEQ_RVT_FF_nldm_220123.lib
+    '6866ea78346b3ac2a630bbd752a9c50f', # flow/platforms/asap7/lib/asap7sc7p5t_SEQ_RVT_SS_nldm_220123.lib
+    'b5e4b8552ecb6d07926b0d55a5c6361b', # flow/platforms/asap7/lib/asap7sc7p5t_SEQ_RVT_TT_nldm_220123.lib
+    'abfc07f4072a571e8835605a9cb5125d', # flow/platforms/asap7/lib/asap7sc7p5t_SEQ_SLVT_FF_nldm_220123.lib
+    '3d7ec4e7bcc3e4d34609aea76239a9d7', # flow/platforms/asap7/lib/asap7sc7p5t_SEQ_SLVT_SS_nldm_220123.lib
+    'cc4456a1a6af57c879cab6855aa4a733', # flow/platforms/asap7/lib/asap7sc7p5t_SEQ_SLVT_TT_nldm_220123.lib
+    'b1c83951043025a8764367e723083cda', # flow/platforms/asap7/lib/asap7sc7p5t_SEQ_SRAM_FF_nldm_220123.lib
+    '78d7269168f7a8510820267c4821b886', # flow/platforms/asap7/lib/asap7sc7p5t_SEQ_SRAM_SS_nldm_220123.lib
+    '108a8fab6d1b1a378017bb19efa7c5bb', # flow/platforms/asap7/lib/asap7sc7p5t_SEQ_SRAM_TT_nldm_220123.lib
+    '83993851d568ab1d10a81ac7d99aac52', # flow/platforms/asap7/lib/asap7sc7p5t_SIMPLE_LVT_FF_nldm_211120.lib
+    '5a023c4b5c68ee8ffa83818d4903e0f5', # flow/platforms/asap7/lib/asap7sc7p5t_SIMPLE_LVT_SS_nldm_211120.lib
+    '9c38e88ab287c2004e9eb2875b3b88bf', # flow/platforms/asap7/lib/asap7sc7p5t_SIMPLE_LVT_TT_nldm_211120.lib
+    '435aaa1153ef048e05ba455a8fc4e977', # flow/platforms/asap7/lib/asap7sc7p5t_SIMPLE_RVT_FF_nldm_211120.lib
+    'f295c7c36e208ae52f8f5d8e17005ca5', # flow/platforms/asap7/lib/asap7sc7p5t_SIMPLE_RVT_SS_nldm_211120.lib
+    '1a2d30afdfb8813fb887cc9a7e8853ce', # flow/platforms/asap7/lib/asap7sc7p5t_SIMPLE_RVT_TT_nldm_211120.lib
+    '5737757cde74a0f83b640b461fb5a21a', # flow/platforms/asap7/lib/asap7sc7p5t_SIMPLE_SLVT_FF_nldm_211120.lib
+    '7ddafeac4c032a4fb5dcd75566925e2a', # flow/platforms/asap7/lib/asap7sc7p5t_SIMPLE_SLVT_SS_nldm_211120.lib
+    '1e4b05df7fefb87a8512df34722d592d', # flow/platforms/asap7/lib/asap7sc7p5t_SIMPLE_SLVT_TT_nldm_211120.lib
+    'a45990f40a27ffb1a7cc18b49245381c', # flow/platforms/asap7/lib/asap7sc7p5t_SIMPLE_SRAM_FF_nldm_211120.lib
+    'ca2737548b647d564cd49491d5405253', # flow/platforms/asap7/lib/asap7sc7p5t_SIMPLE_SRAM_SS_nldm_211120.lib
+    '23c466ad629644d475ad9aea70c9d140', # flow/platforms/asap7/lib/asap7sc7p5t_SIMPLE_SRAM_TT_nldm_211120.lib
+    '7f8441e44c293e86ba66bd955e5fefec', # flow/platforms/asap7/lib/CCS/asap7sc7p5t_AO_RVT_FF_ccs_211120.lib.gz
+    '018308643b530d5f132e306d59912188', # flow/platforms/asap7/lib/CCS/asap7sc7p5t_OA_RVT_FF_ccs_211120.lib.gz
+
+    # OpenSTA
+    '3fa1a5d94780850c447328ef58818426', # examples/gcd_sky130hd.saif.gz
+    'ca325c1b3482d140c1409cfb272b40a7', # examples/gcd_sky130hd.vcd.gz
+    '8fedead39f8766a68a63a98440142acb', # examples/nangate45_fast.lib.gz
+    '3b9185eaab013165d0f5a89f7d9d1a2e', # examples/nangate45_slow.lib.gz
+    'c94625809f3bfffb31d95e58111f859c', # examples/nangate45_typ.lib.gz
+    '1d4440cf42648d62aea5ef6ebbd58aca', # examples/sky130hd_tt.lib.gz
+    'b26c167162182b8d547688d14defa593', # test/asap7_ccsn.lib.gz
+    '8c820a36d21636ae40525762d2db2ae1', # test/asap7_invbuf.lib.gz
+    'edbe2ddcdeb34b419803621f26647ef3', # test/asap7_seq.lib.gz
+    '2b348a7b70ad3fef5afe6502359cfe78', # test/asap7_simple.lib.gz
+    'eb6adcd27132d75e4d27b0c25236d2ef', # test/asap7_small.lib.gz
+    '2ff6395a7d53f7f5e83611150f7754ef', # test/gf180mcu_sram.lib.gz
+
+))
+
+md5_whitelist_cutoff = 15 * 1024 * 1024 # 15 Mb
+
+# Large files allowed by their git blob id, which git already knows, so
+# they are accepted without reading them at all.  This replaces the
+# md5_whitelist: add new entries here.  Run with --migrate-allowlist to
+# print the entries for files in the md5_whitelist.  Until then a blob
+# that passes by its md5 is remembered in the scan cache so it is only
+# read once.
+blob_allowlist = set((
+))
+
+# Commits to these repos aren't checked as they are
+# never to be made public and are intended for confidential
+# data.
+repos_secure = set((
+    '(.*or-[0-9]:)?/platforms/gf12.git',
+    '(.*or-[0-9]:)?/platforms/gf55.git',
+    '(.*or-[0-9]:)?/platforms/tsmc65lp.git',
+    '(.*or-[0-9]:)?/platforms/intel22.git',
+    '(.*or-[0-9]:)?/platforms/intel16.git',
+    '(.*dfm:)?/home/zf4_projects/OpenROAD-guest/platforms/gf12.git',
+    '(.*dfm:)?/home/zf4_projects/OpenROAD-guest/platforms/gf55.git',
+    '(.*dfm:)?/home/zf4_projects/OpenROAD-guest/platforms/tsmc65lp.git',
+    '(.*dfm:)?/home/zf4_projects/OpenROAD-guest/platforms/intel22.git',
+    '(.*dfm:)?/home/zf4_projects/OpenROAD-guest/platforms/intel16.git',
+))
+
+def is_anchored(pattern):
+    'Does pattern start with ^ and have no top level alternation?'
+    if not pattern.startswith('^'):
+        return False
+    depth = 0
+    escaped = False
+    for c in pattern:
+        if escaped:
+            escaped = False
+        elif c == '\\':
+            escaped = True
+        elif c == '(':
+            depth += 1
+        elif c == ')':
+            depth -= 1
+        elif c == '|' and depth == 0:
+            return False
+    return True
+
+
+class PathRules:
+    """A list of path patterns compiled so a name can be tested against
+    every rule in one pass rather than one regex call per rule.
+
+    Patterns anchored at the start of the path are combined into one
+    alternation that only has to be tried at position 0, with a named
+    group per pattern so we know which one matched.  The rest are
+    combined into a second alternation that is searched.  Most names
+    match neither so that is all the work done for them.
+
+    The verbose output has always reported the first rule in list
+    order so when the search does hit we find which of the unanchored
+    rules before the anchored hit (if any) matched first.
+
+    Nothing is compiled until the first match() as compiling the rules
+    is most of the hook's start up time and some (eg the allowed rules)
+    are often never needed.  Individual rules are only compiled once
+    they are needed to say which rule matched."""
+
+    def __init__(self, patterns):
+        self.patterns = list(patterns)
+        self.compiled = False
+
+    def compile(self):
+        self.individual = {}
+        anchored = [i for i, p in enumerate(self.patterns) if is_anchored(p)]
+        self.floating = [i for i, p in enumerate(self.patterns)
+                         if not is_anchored(p)]
+        self.anchored_re = None
+        if anchored:
+            self.anchored_re = \
+                re.compile('|'.join('(?P<r{}>{})'.format(i, self.patterns[i])
+                                    for i in anchored),
+                           re.IGNORECASE)
+        self.floating_re = None
+        if self.floating:
+            self.floating_re = \
+                re.compile('|'.join('(?:{})'.format(self.patterns[i])
+                                    for i in self.floating),
+                           re.IGNORECASE)
+        self.compiled = True
+
+    def rule(self, i):
+        'The compiled pattern i'
+        if i not in self.individual:
+            self.individual[i] = re.compile(self.patterns[i], re.IGNORECASE)
+        return self.individual[i]
+
+    def match(self, name):
+        'Return the first pattern in list order that matches name, or None'
+        if not self.compiled:
+            self.compile()
+        hit = None
+        if self.anchored_re is not None:
+            m = self.anchored_re.match(name)
+            if m:
+                hit = int(m.lastgroup[1:])
+        if self.floating_re is not None and self.floating_re.search(name):
+            for i in self.floating:
+                if hit is not None and i > hit:
+                    break
+                if self.rule(i).search(name):
+                    hit = i
+                    break
+        if hit is None:
+            return None
+        return self.patterns[hit]
+
+
+blocked_path_rules = PathRules(blocked_path_patterns)
+allowed_path_rules = PathRules(allowed_path_patterns)
+skip_content_rules = PathRules(skip_content_patterns)
+
+
+def classify_path(name):
+    """Classify a path against all the path rules.  Returns a tuple
+    (blocked, skip) where blocked is (rule, allowed_rule) with the
+    blocking rule and the allowed rule that overrides it (either may
+    be None) and skip is the skip_content rule that matched or None."""
+    blocked_by = blocked_path_rules.match(name)
+    allowed_by = None
+    if blocked_by is not None:
+        allowed_by = allowed_path_rules.match(name)
+    return (blocked_by, allowed_by), skip_content_rules.match(name)
+
+
+# Slowest files listed in the --stats report
+stats_top = 20
+
+
+class Stats:
+    """Timings and counters for the --stats report.  Times are wall
+    clock seconds accumulated by category (the phases of a check plus
+    things like md5 hashing that happen inside them).  Per-file records
+    are only kept once enabled."""
+
+    def __init__(self):
+        self.enabled = False
+        self.start = time.perf_counter()
+        self.times = collections.OrderedDict()
+        self.counts = collections.OrderedDict()
+        self.files = []
+
+    @contextlib.contextmanager
+    def timed(self, category):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(category, time.perf_counter() - start)
+
+    def add_time(self, category, seconds):
+        self.times[category] = self.times.get(category, 0) + seconds
+
+    def count(self, counter, n=1):
+        self.counts[counter] = self.counts.get(counter, 0) + n
+
+    def file(self, name, kind, size, seconds):
+        if self.enabled:
+            self.files.append({'name': name, 'kind': kind, 'bytes': size,
+                               'seconds': seconds})
+
+    def take(self):
+        """Return and reset what has been recorded so far, for a worker
+        process to hand back to the parent to merge()"""
+        part = (self.times, self.counts, self.files)
+        self.times = collections.OrderedDict()
+        self.counts = collections.OrderedDict()
+        self.files = []
+        return part
+
+    def merge(self, part):
+        times, counts, files = part
+        for category, seconds in times.items():
+            self.add_time(category, seconds)
+        for counter, n in counts.items():
+            self.count(counter, n)
+        self.files.extend(files)
+
+    def report(self):
+        report = collections.OrderedDict()
+        report['wall_seconds'] = time.perf_counter() - self.start
+        report['seconds'] = self.times
+        report.update(self.counts)
+        report['files_scanned'] = len(self.files)
+        report['bytes_scanned'] = sum(f['bytes'] for f in self.files)
+        report['peak_memory_kb'] = peak_memory()
+        report['slowest'] = sorted(self.files, key=lambda f: -f['seconds'])[
+            :stats_top]
+        report['files'] = self.files
+        return report
+
+    def write(self, path):
+        'Write the report as JSON to path (- for stdout)'
+        import json
+        if path == '-':
+            json.dump(self.report(), sys.stdout, indent=2)
+            print()
+            return
+        with open(path, 'w') as f:
+            json.dump(self.report(), f, indent=2)
+            f.write('\n')
+
+
+# What the current run has done, reported by --stats
+run_stats = Stats()
+
+
+def peak_memory():
+    """The peak resident memory in kB of this process and of its
+    children (git and worker processes) that have exited, or None where
+    the resource module is missing (Windows)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss is in bytes on macOS and kB elsewhere
+    scale = 1024 if sys.platform == 'darwin' else 1
+    return {'self': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // scale,
+            'children':
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss // scale}
+
+
+def error(msg):
+    msg = '\n\nERROR: {}\n\nTo request an exception please file an issue on GitHub' \
+      .format(msg)
+    sys.exit(msg)
+
+
+# With --format every violation is collected here and the check
+# carries on.  Otherwise it is None and the first violation stops it.
+collected_violations = None
+
+
+def take_violations():
+    """Return and reset the violations collected so far, for a worker
+    process to hand back to the parent"""
+    global collected_violations
+    found = collected_violations
+    if found is not None:
+        collected_violations = []
+    return found
+
+
+def violation(msg, kind, name=None, rule=None, line=None, offset=None,
+              text=None):
+    """Report a violation of the rules.  Calls error(msg) unless
+    violations are being collected.  kind says which check failed,
+    name is the file, rule is the pattern that matched and line (or
+    offset for binaries) and text say where and what."""
+    if collected_violations is None:
+        error(msg)
+    collected_violations.append(collections.OrderedDict(
+        (key, value) for key, value in (('kind', kind),
+                                        ('file', name),
+                                        ('line', line),
+                                        ('offset', offset),
+                                        ('rule', rule),
+                                        ('text', text),
+                                        ('message', msg))
+        if value is not None))
+
+
+def run_command(command):
+    run_stats.count('subprocesses')
+    r = subprocess.run(command,
+                       stdout=subprocess.PIPE,
+                       encoding='latin-1',
+                       shell=True)
+    r.check_returncode()
+
+    # Split the output into lines
+    return r.stdout.rstrip().split('\n')
+
+
+def run_command_z(command):
+    'Run a git command with -z output and return the NUL separated fields'
+    run_stats.count('subprocesses')
+    r = subprocess.run(command, stdout=subprocess.PIPE)
+    r.check_returncode()
+    fields = r.stdout.decode('utf-8', errors='surrogateescape').split('\0')
+    if fields and fields[-1] == '':
+        fields.pop()
+    return fields
+
+
+def parse_raw(fields):
+    """Parse the NUL separated fields of git's --raw -z diff output into
+    a list of (status, name, sha, mode).  status is a single character
+    (rename/copy scores are stripped) and sha and mode are for the new
+    side.  -z means file names may contain any character, including
+    whitespace."""
+    changes = []
+    i = 0
+    while i < len(fields):
+        if not fields[i]:  # separator between commits
+            i += 1
+            continue
+        # :<old mode> <new mode> <old sha> <new sha> <status>
+        info = fields[i].split()
+        assert(info[0].startswith(':'))  # sanity check
+        status = info[4][0]
+        sha = info[3]
+        mode = info[1]
+        if status in 'RC':  # Renames and copies have old and new names
+            name = fields[i + 2]
+            i += 3
+        else:
+            name = fields[i + 1]
+            i += 2
+        changes.append((status, name, sha, mode))
+    return changes
+
+
+def staged_changes():
+    'Return a list of (status, name, sha) for each staged change'
+    fields = run_command_z(['git', 'diff', '--cached', '--raw', '-z',
+                            '--no-abbrev'])
+    return [change[:3] for change in parse_raw(fields)]
+
+
+def range_changes(revs):
+    """Return a list of (status, name, sha, mode) for every change made
+    by each commit in the revision list revs (eg ['old..new']).  Merges
+    are compared against each parent so content introduced while
+    resolving them is included."""
+    fields = run_command_z(['git', 'log', '-m', '--raw', '-z', '--no-abbrev',
+                            '--no-renames', '--format='] + revs)
+    return parse_raw(fields)
+
+
+def range_objects(revs):
+    'The ids of all objects in the revision list revs'
+    run_stats.count('subprocesses')
+    r = subprocess.run(['git', 'rev-list', '--objects', '--no-object-names']
+                       + revs,
+                       stdout=subprocess.PIPE)
+    r.check_returncode()
+    return set(r.stdout.decode('ascii').split())
+
+
+class BlobReader:
+    """Read blobs through a single long-lived 'git cat-file --batch'
+    process rather than spawning 'git show' for every file."""
+
+    def __init__(self):
+        self.process = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def start(self):
+        run_stats.count('subprocesses')
+        self.process = subprocess.Popen(['git', 'cat-file', '--batch'],
+                                        stdin=subprocess.PIPE,
+                                        stdout=subprocess.PIPE)
+
+    def close(self):
+        if self.process is not None:
+            self.process.stdin.close()
+            self.process.stdout.close()
+            self.process.wait()
+            self.process = None
+
+    def open(self, sha):
+        """Return a BlobStream of the contents of blob sha.  It must be
+        closed before the next blob is opened."""
+        if self.process is None:
+            self.start()
+        self.process.stdin.write(sha.encode('ascii') + b'\n')
+        self.process.stdin.flush()
+        header = self.process.stdout.readline().decode('ascii').split()
+        if len(header) != 3:
+            raise RuntimeError('git cat-file failed on {}: {}'
+                               .format(sha, ' '.join(header)))
+        return BlobStream(self, int(header[2]))
+
+
+class BlobStream:
+    """The contents of one blob read straight from 'git cat-file --batch'
+    so a big blob is never held in memory.  Its size is known from the
+    header before any of it is read.  It can't seek, but bytes read can
+    be pushed back with unread() (eg after sniffing them).  Closing it
+    skips what is left of the blob, unless it is closed by an exception
+    when the cat-file process is stopped instead."""
+
+    def __init__(self, reader, size):
+        self.reader = reader
+        self.size = size
+        self.remaining = size  # still to come from cat-file
+        self.pending = b''     # pushed back by unread()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+        else:
+            self.reader.close()
+
+    def seekable(self):
+        return False
+
+    def tell(self):
+        return self.size - self.remaining - len(self.pending)
+
+    def unread(self, data):
+        self.pending = data + self.pending
+
+    def read(self, n=-1):
+        if n < 0:
+            n = self.remaining + len(self.pending)
+        data = self.pending[:n]
+        self.pending = self.pending[n:]
+        n = min(n - len(data), self.remaining)
+        if n:
+            more = self.reader.process.stdout.read(n)
+            if len(more) != n:
+                raise RuntimeError('git cat-file ended early')
+            self.remaining -= n
+            data += more
+        return data
+
+    def close(self):
+        stdout = self.reader.process.stdout
+        while self.remaining:
+            n = min(self.remaining, hash_block_size)
+            stdout.read(n)
+            self.remaining -= n
+        if self.size >= 0:
+            stdout.read(1)  # trailing newline
+            self.size = -1  # only once
+
+
+# In the scan daemon (--daemon) what it keeps from one request to the
+# next.  None in a normal run.
+resident = None
+
+
+class Resident:
+    """The state the scan daemon keeps warm between requests: a running
+    blob reader and the scan caches it has loaded"""
+
+    def __init__(self):
+        self.reader = BlobReader()
+        self.caches = {}
+        # The GIT_ environment the reader was started with
+        self.env = None
+
+    def close(self):
+        self.reader.close()
+
+
+@contextlib.contextmanager
+def blob_reader():
+    """A BlobReader for a with statement.  In the scan daemon it is the
+    one kept running between requests."""
+    if resident is None:
+        with BlobReader() as reader:
+            yield reader
+    else:
+        yield resident.reader
+
+
+# Big files are hashed in blocks of this size so memory use doesn't
+# grow with the file.
+hash_block_size = 1024 * 1024
+
+
+def file_md5(name):
+    'The md5 of the contents of name, read a block at a time'
+    with open(name, 'rb') as f:
+        return stream_md5(f)
+
+
+def stream_md5(f):
+    'The md5 of what is left of the binary stream f, read a block at a time'
+    import hashlib
+    md5 = hashlib.md5()
+    with run_stats.timed('md5'):
+        while True:
+            block = f.read(hash_block_size)
+            if not block:
+                break
+            md5.update(block)
+    return md5.hexdigest()
+
+
+class HashingReader:
+    """Read the binary stream f working out the md5 of its contents as
+    they go by, so a file can be scanned and hashed in one read.  Like a
+    BlobStream it can't seek but bytes read can be pushed back with
+    unread(), and they aren't hashed again when read a second time."""
+
+    def __init__(self, f):
+        import hashlib
+        self.f = f
+        self.md5 = hashlib.md5()
+        self.pending = b''  # pushed back by unread()
+        self.position = 0   # of the end of what has been read from f
+
+    def seekable(self):
+        return False
+
+    def tell(self):
+        return self.position - len(self.pending)
+
+    def unread(self, data):
+        self.pending = data + self.pending
+
+    def read(self, n=-1):
+        if n < 0:
+            data, self.pending = self.pending, b''
+            more = self.f.read()
+        else:
+            data = self.pending[:n]
+            self.pending = self.pending[n:]
+            more = self.f.read(n - len(data)) if len(data) < n else b''
+        self.md5.update(more)
+        self.position += len(more)
+        return data + more
+
+    def hexdigest(self):
+        'The md5 of the whole stream, reading what is still to come'
+        while self.read(hash_block_size):
+            pass
+        return self.md5.hexdigest()
+
+
+# Content is searched a window of this many characters at a time
+scan_window_size = 1024 * 1024
+
+# Windows normally end at a line break so no match can be split
+# between them.  A line longer than a window is split instead and the
+# next window repeats the last scan_overlap characters.  Matches within
+# scan_margin characters of a split are left to the neighbouring window
+# where they have their full context for lookarounds like \b.  Any
+# match shorter than scan_overlap - 2 * scan_margin is still found whole.
+scan_overlap = 1024
+scan_margin = 64
+
+
+# block_content_patterns for searching raw bytes.  Content is never
+# decoded to search it, only to show a match.  The patterns are ASCII
+# so they find the same things in UTF-8, latin-1 or binary content.
+block_content_bytes = re.compile(block_content_patterns.pattern.encode(),
+                                 block_content_patterns.flags & ~re.UNICODE)
+
+block_content_literals_bytes = [l.encode() for l in block_content_literals]
+
+# Around each literal hit the full regex is run over this many
+# bytes before and after it.
+prefilter_before = 16
+prefilter_after = 128
+
+# Text dense with hits (eg a lot of "param" or "help") is cheaper to
+# search with one plain regex search than this many small ones.
+prefilter_limit = 64
+
+
+def search_blocked_content(buf, pos=0):
+    """Find the first match of block_content_bytes in the bytes buf at
+    or after pos.  The literals that every match contains are looked
+    for first with fast case-insensitive searches and the regex only
+    runs near them.  Most text has no hits at all so the regex never
+    runs."""
+    pattern = block_content_bytes
+    literals = block_content_literals_bytes
+    folded = buf.lower()
+    hits = []
+    for i, literal in enumerate(literals):
+        p = folded.find(literal, pos)
+        if p >= 0:
+            hits.append((p, i))
+    heapq.heapify(hits)
+    searches = 0
+    while hits:
+        p, i = hits[0]
+        lo = max(pos, p - prefilter_before)
+        searches += 1
+        if searches > prefilter_limit:
+            return pattern.search(buf, lo)
+        hi = p + prefilter_after
+        m = pattern.search(buf, lo, hi)
+        # A match too near the end of the region may only be one because
+        # the text after it was cut off (eg verific\b in verification)
+        # so widen the region until it has its full context.
+        while m and m.end() > hi - scan_margin and hi < len(buf):
+            hi += hi - lo
+            m = pattern.search(buf, lo, hi)
+        if m:
+            return m
+        p = folded.find(literals[i], p + 1)
+        if p >= 0:
+            heapq.heapreplace(hits, (p, i))
+        else:
+            heapq.heappop(hits)
+    return None
+
+
+def find_blocked_content(f):
+    """Search the raw bytes of the text stream f for
+    block_content_patterns one window at a time.  Returns (line number,
+    line) for the first match or None.  Line numbers are only worked
+    out, and the line only decoded, when something matches."""
+    line_no = 1   # line number of the start of buf
+    carry = b''   # tail of the previous window still to be checked
+    skip = 0      # bytes at the start of carry already checked
+    while True:
+        data = f.read(scan_window_size)
+        buf = carry + data
+        if not data:
+            end = limit = len(buf)
+        else:
+            end = limit = buf.rfind(b'\n') + 1
+            if end == 0:  # no line break, split the line if it is long
+                if len(buf) <= scan_window_size:
+                    carry = buf
+                    continue
+                end = len(buf) - scan_overlap
+                limit = len(buf) - scan_margin
+        m = search_blocked_content(buf, skip)
+        if m and m.end() <= limit:
+            line_no += buf.count(b'\n', 0, m.start())
+            line_start = buf.rfind(b'\n', 0, m.start()) + 1
+            line_end = buf.find(b'\n', m.start())
+            while line_end < 0:
+                # Finish the line for the message unless it is huge
+                more = b''
+                if len(buf) - line_start < scan_window_size:
+                    more = f.read(scan_window_size)
+                if not more:
+                    line_end = len(buf)
+                else:
+                    line_end = more.find(b'\n')
+                    if line_end >= 0:
+                        line_end += len(buf)
+                    buf += more
+            line = buf[line_start:line_end].rstrip(b'\r')
+            return line_no, line.decode('utf-8', errors='replace')
+        if not data:
+            return None
+        line_no += buf.count(b'\n', 0, end)
+        carry = buf[end:]
+        skip = 0 if limit == end else scan_margin
+
+
+printable_bytes = frozenset(range(0x20, 0x7f)) | {ord('\t')}
+
+
+def embedded_string(buf, start, end, limit=80):
+    'The printable string around buf[start:end], up to limit more each side'
+    lo = start
+    while lo > 0 and start - lo < limit and buf[lo - 1] in printable_bytes:
+        lo -= 1
+    hi = end
+    while hi < len(buf) and hi - end < limit and buf[hi] in printable_bytes:
+        hi += 1
+    return buf[lo:hi].decode('ascii', errors='replace')
+
+
+def find_blocked_strings(f):
+    """Search the raw bytes of the binary stream f for
+    block_content_patterns a window at a time.  The patterns are plain
+    ASCII so this finds them in any strings embedded in the binary
+    without decoding it.  Returns (byte offset, string) for the first
+    match or None."""
+    offset = 0    # of the start of buf in the stream
+    buf = b''
+    skip = 0      # bytes at the start of buf already checked
+    while True:
+        data = f.read(scan_window_size)
+        buf += data
+        limit = len(buf) - scan_margin if data else len(buf)
+        m = search_blocked_content(buf, skip)
+        if m and m.end() <= limit:
+            return (offset + m.start(),
+                    embedded_string(buf, m.start(), m.end()))
+        if not data:
+            return None
+        if len(buf) > scan_overlap:
+            cut = len(buf) - scan_overlap
+            offset += cut
+            buf = buf[cut:]
+            skip = scan_margin
+
+
+def rules_version():
+    """A hash of every rule, and the version of the scanner, that decides
+    whether a blob's content is clean.  Any change to either changes the
+    version and so invalidates the scan cache and the --local manifest."""
+    import hashlib
+    h = hashlib.sha1()
+    h.update(str(scan_cache_format).encode())
+    h.update(str(scanner_version).encode())
+    h.update(block_content_patterns.pattern.encode())
+    h.update(str(block_content_patterns.flags).encode())
+    for pattern in skip_content_patterns:
+        h.update(b'\0' + pattern.encode())
+    for md5_hash in sorted(md5_whitelist):
+        h.update(b'\0' + md5_hash.encode())
+    h.update(str(md5_whitelist_cutoff).encode())
+    return h.hexdigest()
+
+
+# Bump if the layout of the scan cache file changes
+scan_cache_format = 1
+
+# Bump whenever a change to how content is scanned (eg sniffing, gzip
+# or binary handling) could change what passes, so nothing recorded as
+# clean by an older scanner is trusted
+scanner_version = 2
+
+# Most blobs the scan cache remembers.  The least recently used are
+# evicted first.
+scan_cache_limit = 100000
+
+
+class ScanCache:
+    """Blob ids whose content has already passed the content check
+    under the current rules, kept in a file under the git dir.  The
+    first line of the file is the rules version, followed by one blob
+    id per line with the most recently used last."""
+
+    def __init__(self, path, version=None, limit=None):
+        self.path = path
+        self.version = version or rules_version()
+        self.limit = limit or scan_cache_limit
+        self.blobs = collections.OrderedDict()
+        self.changed = False
+        self.hits = 0
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                if f.readline().rstrip('\n') != self.version:
+                    self.changed = True  # stale, rewrite on save
+                    return
+                for line in f:
+                    self.blobs[line.rstrip('\n')] = None
+        except OSError:
+            pass
+
+    def __contains__(self, sha):
+        if sha in self.blobs:
+            self.blobs.move_to_end(sha)
+            self.changed = True
+            self.hits += 1
+            return True
+        return False
+
+    def add(self, sha):
+        self.blobs[sha] = None
+        self.blobs.move_to_end(sha)
+        while len(self.blobs) > self.limit:
+            self.blobs.popitem(last=False)
+        self.changed = True
+
+    def save(self):
+        if not self.changed:
+            return
+        tmp = '{}.{}'.format(self.path, os.getpid())
+        try:
+            with open(tmp, 'w') as f:
+                f.write(self.version + '\n')
+                for sha in self.blobs:
+                    f.write(sha + '\n')
+            os.replace(tmp, self.path)
+        except OSError as e:
+            # The cache is only an optimization
+            print('Unable to save scan cache {}: {}'.format(self.path, e))
+        self.changed = False
+
+
+def open_scan_cache(git_dir):
+    """The scan cache of git_dir.  The scan daemon loads it once and
+    keeps it between requests."""
+    path = os.path.join(git_dir, 'pre-commit-scan-cache')
+    if resident is None:
+        return ScanCache(path)
+    cache = resident.caches.get(path)
+    if cache is None:
+        cache = resident.caches[path] = ScanCache(path)
+    cache.hits = 0
+    return cache
+
+
+def check_big(name, md5_hash, args):
+    """A big file must be in the md5 whitelist.  Returns True if it
+    is."""
+    if md5_hash in md5_whitelist:
+        if args.verbose:
+            print('Skipping big {} with hash {}'.format(name, md5_hash))
+        return True
+    violation('File {} is big but not whitelisted (hash {})'
+              .format(name, md5_hash), 'big-file', name, text=md5_hash)
+    return False
+
+
+def allowlisted(name, sha, args, cache=None):
+    """Is blob sha, known as name, in the blob_allowlist or the scan
+    cache?  Either way it needn't be read."""
+    if sha in blob_allowlist:
+        if args.verbose:
+            print('Skipping allowlisted {} ({})'.format(name, sha))
+        return True
+    if cache is not None and sha in cache:
+        if args.verbose:
+            print("Skipping cached {} ({})".format(name, sha))
+        return True
+    return False
+
+
+# How much of the start of a file is looked at to decide whether it is
+# text or binary.  Like git, a NUL byte in it means binary.
+sniff_size = 8000
+
+# Magic numbers of binary formats we commonly see that may not have a
+# NUL byte near their start
+binary_magic = (
+    (b'\x7fELF', 'ELF'),
+    (b'!<arch>\n', 'ar archive'),
+    (b'PK\x03\x04', 'zip'),
+    (b'%PDF-', 'PDF'),
+    (b'\x89PNG', 'PNG'),
+    (b'GIF8', 'GIF'),
+    (b'\xff\xd8\xff', 'JPEG'),
+    (b'\xcf\xfa\xed\xfe', 'Mach-O'),
+    (b'SQLite format 3\x00', 'SQLite'),
+)
+
+
+def sniff(head):
+    """Classify content from its first bytes as 'text', 'gzip' or the
+    kind of binary"""
+    if head.startswith(b'\x1f\x8b'):
+        return 'gzip'
+    for magic, kind in binary_magic:
+        if head.startswith(magic):
+            return kind
+    if b'\0' in head:
+        return 'binary'
+    return 'text'
+
+
+def find_blocked(f):
+    """Search the binary stream f for blocked content as sniff() says
+    it should be searched.  Text is searched a line at a time, gzip is
+    decompressed first and binaries are searched for embedded strings.
+    Nothing is decoded unless it matches.  Returns (kind, found, size)
+    where found is None or (line number, line) for text and gzip and
+    (byte offset, string) for binaries, and size is how much was read."""
+    head = f.read(sniff_size)
+    if f.seekable():
+        f.seek(0)
+    else:
+        f.unread(head)
+    kind = sniff(head)
+    if kind == 'gzip':
+        found = find_blocked_gzip(f)
+        if found is not None:
+            return found
+        kind = 'binary'
+    if kind == 'text':
+        found = find_blocked_content(f)
+    else:
+        found = find_blocked_strings(f)
+    return kind, found, f.tell()
+
+
+class GzipStream:
+    """The decompressed content of the gzip binary stream f.  Unlike
+    gzip.GzipFile everything that decompressed before an error is still
+    read, and then the stream ends with error set to say what was wrong,
+    so damaged content can be scanned as far as it goes.  Until anything
+    has decoded (some output or a whole member) the compressed bytes
+    read are kept in raw in case it isn't gzip at all."""
+
+    def __init__(self, f):
+        import zlib
+        self.zlib = zlib
+        self.f = f
+        self.decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+        self.started = False  # the current member has had some input
+        self.unused = b''     # compressed input still to be decompressed
+        self.output = b''     # decompressed but not yet read
+        self.position = 0     # decompressed bytes read
+        self.decoded = False
+        self.raw = []
+        self.error = None
+        self.done = False
+
+    def tell(self):
+        return self.position
+
+    def read(self, n=-1):
+        while not self.done and (n < 0 or len(self.output) < n):
+            self.decompress()
+        if n < 0:
+            n = len(self.output)
+        data = self.output[:n]
+        self.output = self.output[n:]
+        self.position += len(data)
+        return data
+
+    def decompress(self):
+        'Decompress the next piece of the input onto output'
+        if self.unused:
+            data, self.unused = self.unused, b''
+        else:
+            data = self.f.read(scan_window_size)
+            if not self.decoded:
+                self.raw.append(data)
+            if not data:
+                self.output += self.decompressor.flush()
+                if self.started:
+                    self.error = 'it ends part way through'
+                self.done = True
+                return
+        if not self.started:
+            # Like gzip, allow zeros padding the end
+            data = data.lstrip(b'\0')
+            if not data:
+                return
+        try:
+            # Limited so a small input can't make a huge output
+            out = self.decompressor.decompress(data, scan_window_size)
+        except self.zlib.error as e:
+            self.error = str(e)
+            self.done = True
+            return
+        self.started = True
+        if out:
+            self.decoded = True
+            self.output += out
+        if self.decompressor.eof:
+            self.decoded = True
+            self.unused = self.decompressor.unused_data
+            self.decompressor = self.zlib.decompressobj(
+                self.zlib.MAX_WBITS | 16)
+            self.started = False
+        else:
+            self.unused = self.decompressor.unconsumed_tail
+
+
+def find_blocked_gzip(f):
+    """find_blocked() on the binary stream f that starts like gzip.  If
+    it is damaged what could be decompressed is searched and the kind is
+    'damaged gzip'.  Returns None if nothing at all decompresses, with f
+    back at its start, as then it is just a binary with the same first
+    bytes.  A stream that can't seek has what was read pushed back,
+    which is no more than the md5_whitelist_cutoff as bigger content
+    isn't scanned."""
+    g = GzipStream(f)
+    found = find_blocked_content(g)
+    if g.error is None or found:
+        return 'damaged gzip' if g.error else 'gzip', found, g.tell()
+    if g.decoded:
+        return 'damaged gzip', None, g.tell()
+    if f.seekable():
+        f.seek(0)
+    else:
+        f.unread(b''.join(g.raw))
+    return None
+
+
+def scan_bytes(data):
+    """find_blocked() on the bytes data.  This and path_blocked() check
+    content and names without needing a repo."""
+    return find_blocked(io.BytesIO(data))[:2]
+
+
+def scan_stream(name, f, args):
+    """Check the content of the binary stream f, known as name.  Returns
+    True if it is clean."""
+    start = time.perf_counter()
+    kind, found, size = find_blocked(f)
+    run_stats.file(name, kind, size, time.perf_counter() - start)
+    if args.verbose:
+        print("Checking {} as {}".format(name, kind))
+    if kind in ('text', 'gzip', 'damaged gzip'):
+        report_blocked_content(name, found)
+        if kind == 'damaged gzip' and not found:
+            # Fail closed as the rest of it can't be checked
+            violation("File {} is gzip but is damaged so can't be checked"
+                      .format(name), 'damaged-gzip', name)
+            return False
+    elif found:
+        msg = "File {} contains blocked content" \
+            " at byte offset {} :\n  {}" \
+            .format(name, *found)
+        rule, text = content_rule(found[1])
+        violation(msg, 'blocked-content', name, rule, offset=found[0],
+                  text=text)
+    return found is None
+
+
+def report_blocked_content(name, found):
+    'Report a violation if find_blocked_content found anything'
+    if found:
+        msg = "File {} contains blocked content" \
+            " on line {} :\n  {}" \
+            .format(name, *found)
+        rule, text = content_rule(found[1])
+        violation(msg, 'blocked-content', name, rule, line=found[0],
+                  text=text)
+
+
+# Each top level alternative of block_content_patterns on its own, to
+# say which one matched in reports.  Compiled on first use.
+block_content_rules = None
+
+
+def content_rule(line):
+    """Return (rule, matched text) for the first match of
+    block_content_patterns in the reported line"""
+    global block_content_rules
+    m = block_content_patterns.search(line)
+    if m is None:  # eg the line was split for being huge
+        return None, None
+    if block_content_rules is None:
+        block_content_rules = [
+            re.compile(source.split(' #')[0].lstrip('| ').strip(),
+                       block_content_patterns.flags)
+            for source in block_content_patterns.pattern.splitlines()
+            if source.split(' #')[0].strip()
+        ]
+    for rule in block_content_rules:
+        if rule.match(line, m.start()):
+            return rule.pattern, m.group()
+    return None, m.group()
+
+
+def content_skipped(name, args, whole_file=False):
+    'Is the content check of name skipped?'
+    if skip_content_rules.match(name):
+        if args.verbose:
+            print("Skipping content check on {}".format(name))
+        return True
+
+    # Submodules updates will show up as names to be checked but they
+    # should have their contents checked when the submodule itself
+    # was committed to. Skip them here.
+    if os.path.isdir(name):
+        print("Skipping content check on subdir {}".format(name))
+        return True
+
+    if whole_file and os.path.islink(name):
+        if args.verbose:
+            print("Skipping link", name)
+        return True
+    return False
+
+
+def check_content(name, args, whole_file=False, reader=None, sha=None):
+    """Check the content of name and report a violation if it contains
+    blocked content.  Returns True if the content was checked and is
+    clean, False if the check was skipped or found something."""
+    if content_skipped(name, args, whole_file):
+        return False
+
+    if not whole_file:
+        # Read the staged blob, not what is currently on disk unstaged
+        # which could be different (and possibly not contain the
+        # keyword).  We check the whole file not just the changed
+        # portion.
+        return check_blob(name, args, reader, sha)
+
+    # Check big files in the md5 whitelist
+    size = os.stat(name).st_size
+    if size >= md5_whitelist_cutoff:
+        return check_big(name, file_md5(name), args)
+
+    with open(name, 'rb') as f:
+        return scan_stream(name, f, args)
+
+
+def check_blob(name, args, reader, sha):
+    """Check the content of blob sha, known as name, straight from the
+    object store without touching the working tree.  The blob is
+    streamed so memory use doesn't grow with its size.  As with whole
+    file checks every big blob must be whitelisted, which is decided
+    from its size before any of it is read.  The caller applies the
+    skip_content rules.  Returns True if the content was checked and is
+    clean."""
+    with reader.open(sha) as f:
+        if f.size >= md5_whitelist_cutoff:
+            return check_big(name, stream_md5(f), args)
+        return scan_stream(name, f, args)
+
+
+def path_blocked(name):
+    'The blocked path rule that applies to name, None if it is allowed'
+    blocked_by, allowed_by = classify_path(name)[0]
+    return blocked_by if allowed_by is None else None
+
+
+def is_blocked(name, args):
+    'Is this name blocked by the path patterns?'
+    pattern = blocked_path_rules.match(name)
+    if pattern is None:
+        return False
+    if args.verbose:
+        print("{} matches blocked {}".format(name, pattern))
+    pattern = allowed_path_rules.match(name)
+    if pattern is None:
+        return True
+    if args.verbose:
+        print("{} matches allowed {}".format(name, pattern))
+    return False
+
+
+def parse_args(args):
+    parser = argparse.ArgumentParser(description='Commit checker')
+    parser.add_argument('--local', action='store_true')
+    parser.add_argument('--pre-receive', action='store_true',
+                        help='run as a server side pre-receive hook (the'
+                        ' default when installed as pre-receive)')
+    parser.add_argument('--range', metavar='OLD..NEW',
+                        help='check the commits in a range instead of the'
+                        ' staged changes')
+    parser.add_argument('--report', action='store_true')
+    parser.add_argument('--verbose', action='store_true')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='ignore and do not update the scan cache')
+    parser.add_argument('--untracked', action='store_true',
+                        help='also check untracked files with --local')
+    parser.add_argument('--walk', action='store_true',
+                        help='check every file under the top directory with'
+                        ' --local, not just those git knows about')
+    parser.add_argument('--full', action='store_true',
+                        help='check everything, ignoring the --local'
+                        ' manifest and hunk only mode')
+    parser.add_argument('--hunks', action='store_true',
+                        help='only check the lines added to staged files'
+                        ' (also set by git config precommit.hunks)')
+    parser.add_argument('--jobs', type=int,
+                        help='processes to use for --local and --pre-receive'
+                        ' (0 for all cores)')
+    parser.add_argument('--migrate-allowlist', action='store_true',
+                        help='print blob_allowlist entries for the files in'
+                        ' HEAD that are allowed by the md5_whitelist')
+    parser.add_argument('--format', choices=('json', 'sarif'),
+                        help='check everything and write every violation'
+                        ' found in this format rather than stopping at the'
+                        ' first')
+    parser.add_argument('--output', metavar='FILE', default='-',
+                        help='where --format writes (default stdout)')
+    parser.add_argument('--stats', metavar='FILE',
+                        help='write a JSON report of where the time went'
+                        ' to FILE (- for stdout)')
+    parser.add_argument('--daemon', action='store_true',
+                        help='run the scan daemon for this repo, which'
+                        ' later hook runs hand their checks to')
+    parser.add_argument('--no-daemon', action='store_true',
+                        help='check in this process even if a scan daemon'
+                        ' is running')
+    return parser.parse_args(args)
+
+
+def walk_error(e):
+    raise e
+
+
+def local_files(top):
+    'List the files under top, relative to top, in a stable order'
+    files = []
+    for root, dirs, names in os.walk(top,
+                                     onerror=walk_error):
+        assert(root.startswith(top))
+        dirs.sort()
+        if root == top:
+            root = ''
+        else:
+            root = root[len(top)+1:]
+        for name in sorted(names):
+            files.append(os.path.join(root, name))
+    return files
+
+
+def git_files(untracked=False):
+    """List the files git tracks (including staged ones and those in
+    checked out submodules) in a stable order, optionally with untracked
+    files that aren't ignored.  Names are NUL separated so they may
+    contain any character."""
+    names = set(run_command_z(['git', 'ls-files', '-z', '--cached',
+                               '--recurse-submodules']))
+    if untracked:
+        # git can't list untracked files in submodules
+        names.update(run_command_z(['git', 'ls-files', '-z', '--others',
+                                    '--exclude-standard']))
+    files = []
+    for name in sorted(names):
+        # Deleted from the working tree but not yet from the index
+        if os.path.lexists(name):
+            files.append(name)
+    return files
+
+
+def check_local_file(name, args):
+    """Check the content of name and return what the local manifest
+    records for it: its md5 hash if it is clean, '-' if its content
+    check was skipped (as then it is cheap to repeat) or it is big (as
+    big files aren't read again to hash them, they are looked up by blob
+    id if they are touched), or None if it has a violation and so must
+    not be recorded at all."""
+    if content_skipped(name, args, whole_file=True):
+        return '-'
+    if os.stat(name).st_size >= md5_whitelist_cutoff:
+        return '-' if check_big(name, file_md5(name), args) else None
+    with open(name, 'rb') as f:
+        f = HashingReader(f)
+        if not scan_stream(name, f, args):
+            return None
+        return f.hexdigest()
+
+
+def index_blobs(names):
+    """The blob ids of those of names whose working tree file git says
+    is unchanged from the index, so the id is that of its content.
+    Files in submodules aren't listed as their changes aren't seen from
+    here."""
+    if not names:
+        return {}
+    blobs = {}
+    for entry in run_command_z(['git', 'ls-files', '-s', '-z', '--']
+                               + names):
+        info, name = entry.split('\t', 1)
+        mode, sha, stage = info.split()
+        if stage == '0':
+            blobs[name] = sha
+    for name in run_command_z(['git', 'diff-files', '--name-only', '-z',
+                               '--'] + names):
+        blobs.pop(name, None)
+    return blobs
+
+
+class LocalManifest:
+    """The size, mtime, inode and md5 hash of every file from the last
+    clean --local run so unchanged files needn't be scanned again.  The
+    first line of the file is the rules version followed by one NUL
+    terminated record per file."""
+
+    def __init__(self, path, version=None):
+        self.path = path
+        self.version = version or rules_version()
+        self.entries = {}
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, encoding='utf-8',
+                      errors='surrogateescape') as f:
+                if f.readline().rstrip('\n') != self.version:
+                    return
+                records = f.read().split('\0')
+        except OSError:
+            return
+        for record in records[:-1]:
+            size, mtime, ino, md5_hash, name = record.split(' ', 4)
+            self.entries[name] = (int(size), int(mtime), int(ino), md5_hash)
+
+    def unchanged(self, name, st):
+        'Is name, with os.lstat result st, the same as when last clean?'
+        entry = self.entries.get(name)
+        if entry is None:
+            return False
+        size, mtime, ino, md5_hash = entry
+        if size != st.st_size:
+            return False
+        if mtime == st.st_mtime_ns and ino == st.st_ino:
+            return True
+        # Touched (eg by a checkout) but possibly not changed
+        if md5_hash == '-' or not stat.S_ISREG(st.st_mode):
+            return False
+        if file_md5(name) != md5_hash:
+            return False
+        self.entries[name] = (size, st.st_mtime_ns, st.st_ino, md5_hash)
+        return True
+
+    def update(self, name, st, md5_hash):
+        'Record name as clean, or forget it if md5_hash is None'
+        if md5_hash is None:
+            self.entries.pop(name, None)
+        else:
+            self.entries[name] = (st.st_size, st.st_mtime_ns, st.st_ino,
+                                  md5_hash)
+
+    def save(self, names):
+        'Write the manifest with the entries for those of names it has'
+        tmp = '{}.{}'.format(self.path, os.getpid())
+        try:
+            with open(tmp, 'w', encoding='utf-8',
+                      errors='surrogateescape') as f:
+                f.write(self.version + '\n')
+                for name in names:
+                    if name in self.entries:
+                        f.write('{} {} {} {} {}\0'.format(
+                            *self.entries[name], name))
+            os.replace(tmp, self.path)
+        except OSError as e:
+            # The manifest is only an optimization
+            print('Unable to save local manifest {}: {}'.format(self.path,
+                                                                e))
+
+
+# Work is handed to worker processes in chunks of this size to keep
+# the interprocess overhead down.
+check_chunk_size = 16
+
+# The args for this worker process, set by init_worker
+worker_args = None
+
+# The blob reader for this worker process, started on first use
+worker_reader = None
+
+
+def init_worker(args):
+    global worker_args
+    worker_args = args
+    # Forked workers start with a copy of the parent's stats
+    run_stats.take()
+    run_stats.enabled = args.stats is not None
+    global collected_violations
+    collected_violations = [] if args.format else None
+    # Compile the rules before the first file arrives
+    skip_content_rules.compile()
+
+
+def check_worker_blob(item, args):
+    'Check a (sha, name) blob in a worker process'
+    global worker_reader
+    if worker_reader is None:
+        worker_reader = BlobReader()
+    sha, name = item
+    return check_blob(name, args, worker_reader, sha)
+
+
+def check_chunk(check, items):
+    """Call check(item, args) on each of items in order in a worker
+    process.  Returns the captured output, the first error message (or
+    None), the results of the checks, the stats recorded and any
+    violations collected so the parent can report them in a
+    deterministic order."""
+    out = io.StringIO()
+    results = []
+    msg = None
+    with contextlib.redirect_stdout(out):
+        try:
+            for item in items:
+                results.append(check(item, worker_args))
+        except SystemExit as e:
+            msg = str(e.code)
+    return out.getvalue(), msg, results, run_stats.take(), take_violations()
+
+
+def check_parallel(check, items, args, jobs):
+    """Call check(item, args) on items over a pool of processes and
+    return the results.  The outcome is the same as checking them in
+    order: output is printed in item order and the error reported is
+    from the first failing item.  Once a chunk fails every later chunk
+    is cancelled."""
+    import concurrent.futures
+    chunks = [items[i:i + check_chunk_size]
+              for i in range(0, len(items), check_chunk_size)]
+    results = [None] * len(chunks)
+    failed = len(chunks)
+    with concurrent.futures.ProcessPoolExecutor(
+            max_workers=jobs,
+            initializer=init_worker,
+            initargs=(args,)) as pool:
+        futures = [pool.submit(check_chunk, check, c) for c in chunks]
+        index = {f: i for i, f in enumerate(futures)}
+        pending = set(futures)
+        while any(index[f] < failed for f in pending):
+            done, pending = concurrent.futures.wait(
+                pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for f in done:
+                if f.cancelled():
+                    continue
+                i = index[f]
+                results[i] = f.result()
+                if results[i][1] is not None and i < failed:
+                    failed = i
+                    for later in futures[i + 1:]:
+                        later.cancel()
+
+    checked = []
+    for output, msg, chunk_results, chunk_stats, found in \
+            results[:failed + 1]:
+        sys.stdout.write(output)
+        run_stats.merge(chunk_stats)
+        if found:
+            collected_violations.extend(found)
+        if msg is not None:
+            sys.exit(msg)
+        checked.extend(chunk_results)
+    return checked
+
+
+def job_count(args, default=1):
+    'The number of processes to use from --jobs (0 means all cores)'
+    if args.jobs is None:
+        return default
+    return args.jobs or os.cpu_count()
+
+
+def local(top, args, git_dir=None):
+    """Check the local tree not the git diff.  This is for private to
+    public prechecking.  Files unchanged since the last clean run are
+    not scanned again unless --full is given."""
+    with run_stats.timed('file listing'):
+        if args.walk:
+            files = local_files(top)
+        else:
+            files = git_files(args.untracked)
+
+    # Check: blocked files
+    with run_stats.timed('path checks'):
+        for name in files:
+            if is_blocked(name, args):
+                msg = "File name is blocked: {}".format(name)
+                violation(msg, 'blocked-path', name, path_blocked(name))
+
+    manifest = None
+    if git_dir is not None:
+        manifest = LocalManifest(os.path.join(git_dir,
+                                              'pre-commit-local-manifest'))
+        if args.full:
+            manifest.entries.clear()
+
+    # Check: blocked content on new and changed files
+    stats = {}
+    todo = []
+    for name in files:
+        stats[name] = os.lstat(name)
+        if manifest is not None and manifest.unchanged(name, stats[name]):
+            run_stats.count('manifest_hits')
+            if args.verbose:
+                print("Skipping unchanged {}".format(name))
+        else:
+            todo.append(name)
+
+    # Big files that git knows by blob id are allowed by it unread
+    big = [name for name in todo if stat.S_ISREG(stats[name].st_mode)
+           and stats[name].st_size >= md5_whitelist_cutoff
+           and not skip_content_rules.match(name)]
+    blobs = index_blobs(big)
+    cache = None
+    if blobs and git_dir is not None and not args.no_cache:
+        cache = open_scan_cache(git_dir)
+    allowed = set(name for name, sha in blobs.items()
+                  if allowlisted(name, sha, args, cache))
+    todo = [name for name in todo if name not in allowed]
+
+    jobs = job_count(args)
+    with run_stats.timed('content checks'):
+        if jobs > 1:
+            hashes = check_parallel(check_local_file, todo, args, jobs)
+        else:
+            hashes = [check_local_file(name, args) for name in todo]
+
+    # Remember big files that passed by md5 so they aren't read again
+    if cache is not None:
+        for name, md5_hash in zip(todo, hashes):
+            if md5_hash is not None and name in blobs:
+                cache.add(blobs[name])
+        run_stats.count('scan_cache_hits', cache.hits)
+        cache.save()
+
+    if manifest is not None:
+        for name in allowed:
+            manifest.update(name, stats[name], '-')
+        for name, md5_hash in zip(todo, hashes):
+            manifest.update(name, stats[name], md5_hash)
+        manifest.save(files)
+
+
+def check_revisions(revs, args, git_dir, jobs=1):
+    """Check the commits in the revision list revs (eg ['old..new'])
+    straight from the git objects.  Every path added or changed is
+    checked against the path rules and every blob new to the commits
+    has its content checked once, however many paths it appears at."""
+    with run_stats.timed('diff listing'):
+        changes = [c for c in range_changes(revs) if c[0] != 'D']
+
+    # Check: blocked files
+    names = set()
+    with run_stats.timed('path checks'):
+        for status, name, sha, mode in changes:
+            if name not in names:
+                names.add(name)
+                if is_blocked(name, args):
+                    msg = "File name is blocked: {}".format(name)
+                    violation(msg, 'blocked-path', name, path_blocked(name))
+
+    # Check: blocked content.  Submodules are checked in their own repo.
+    with run_stats.timed('diff listing'):
+        new_objects = range_objects(revs)
+    blobs = collections.OrderedDict()
+    for status, name, sha, mode in changes:
+        if mode != '160000' and sha in new_objects:
+            blobs.setdefault(sha, [])
+            if name not in blobs[sha]:
+                blobs[sha].append(name)
+
+    cache = None
+    if not args.no_cache:
+        cache = open_scan_cache(git_dir)
+    todo = []
+    for sha, names in blobs.items():
+        # Only skipped if every name it appears at is skipped
+        checked = [n for n in names if not skip_content_rules.match(n)]
+        if not checked:
+            if args.verbose:
+                print("Skipping content check on {}".format(', '.join(names)))
+        elif not allowlisted(checked[0], sha, args, cache):
+            todo.append((sha, checked[0]))
+
+    try:
+        with run_stats.timed('content checks'):
+            if jobs > 1:
+                results = check_parallel(check_worker_blob, todo, args, jobs)
+            else:
+                with blob_reader() as reader:
+                    results = [check_blob(name, args, reader, sha)
+                               for sha, name in todo]
+        if cache is not None:
+            for (sha, name), clean in zip(todo, results):
+                if clean:
+                    cache.add(sha)
+    finally:
+        if cache is not None:
+            run_stats.count('scan_cache_hits', cache.hits)
+            cache.save()
+
+    if not collected_violations:
+        print("Passed")
+
+
+# Default number of processes used to check a push
+pre_receive_jobs = 4
+
+
+def pre_receive(f, args, git_dir):
+    """Check a push as a server side pre-receive hook.  f has an
+    '<old> <new> <ref>' line for each ref being updated.  Only the
+    commits and blobs that aren't already reachable from a ref in the
+    repository are checked."""
+    news = []
+    for line in f:
+        old, new, ref = line.split()
+        if new.strip('0'):  # all zeros when a ref is deleted
+            news.append(new)
+    if not news:
+        return
+    jobs = job_count(args, min(pre_receive_jobs, os.cpu_count()))
+    check_revisions(news + ['--not', '--all'], args, git_dir, jobs)
+
+
+def check_staged_content(lines, args, git_dir):
+    """Check the whole of every staged blob.  Blobs that have already
+    passed under the current rules are skipped."""
+    cache = None
+    if not args.no_cache:
+        cache = open_scan_cache(git_dir)
+    try:
+        with blob_reader() as reader:
+            for status, name, sha in lines:
+                if status == 'D': # deleted are always ok
+                    continue
+                if allowlisted(name, sha, args, cache):
+                    continue
+                if check_content(name, args, reader=reader, sha=sha) \
+                   and cache is not None:
+                    cache.add(sha)
+    finally:
+        if cache is not None:
+            run_stats.count('scan_cache_hits', cache.hits)
+            cache.save()
+
+
+# In hunk only mode the whole tree is still checked (as with --local)
+# when the last full check is older than this many seconds.  CI should
+# run --local or --range for a full check regardless.
+full_sweep_interval = 7 * 24 * 60 * 60
+
+
+def hunks_only(args, config):
+    """Should only the added lines of staged files be checked?  Set with
+    --hunks or 'git config precommit.hunks true' and overridden by
+    --full.  config is from git_config()."""
+    if args.full:
+        return False
+    if args.hunks:
+        return True
+    values = config.get('precommit.hunks')
+    # A key with no value is true
+    return bool(values) and values[-1].lower() in ('true', 'yes', 'on', '1',
+                                                    '')
+
+
+def full_sweep_due(git_dir):
+    try:
+        mtime = os.stat(os.path.join(git_dir, 'pre-commit-full-sweep')).st_mtime
+    except OSError:
+        return True
+    return time.time() - mtime > full_sweep_interval
+
+
+def mark_full_sweep(git_dir):
+    with open(os.path.join(git_dir, 'pre-commit-full-sweep'), 'w') as f:
+        f.write('{}\n'.format(time.ctime()))
+
+
+hunk_header = re.compile(rb'^@@ -\d+(?:,(\d+))? \+(\d+)(?:,(\d+))? @@')
+
+# The escapes git uses when it quotes a path, other than octal
+path_escapes = {b'a': b'\a', b'b': b'\b', b't': b'\t', b'n': b'\n',
+                b'v': b'\v', b'f': b'\f', b'r': b'\r', b'"': b'"',
+                b'\\': b'\\'}
+
+
+def unquote_path(path):
+    """Undo the C style quoting git gives a path (as bytes) with unusual
+    characters in it in a diff header, eg "tab\\tname" """
+    if not path.startswith(b'"'):
+        return path
+    return re.sub(rb'\\([0-7]{3}|.)',
+                  lambda m: bytes([int(m.group(1), 8)])
+                  if len(m.group(1)) == 3 else path_escapes[m.group(1)],
+                  path[1:-1])
+
+
+def staged_hunks():
+    """Yield (file name, first line number, added lines as bytes) for
+    each hunk of the staged diff that adds lines.  The name is taken
+    from the '+++' header of the hunk's own file.  Hunk bodies are
+    consumed by their line counts so content that looks like a diff
+    header can't confuse us.  Renames and copies are shown as wholly
+    added files so a file can't lose its skip rule by being renamed,
+    and the content is never run through a textconv driver."""
+    run_stats.count('subprocesses')
+    process = subprocess.Popen(['git', 'diff', '--cached', '-U0', '--text',
+                                '--no-color', '--no-ext-diff', '--no-prefix',
+                                '--no-renames', '--no-textconv',
+                                '--submodule=short'],
+                               stdout=subprocess.PIPE)
+    name = None
+    removed = added = 0
+    for line in process.stdout:
+        if line.endswith(b'\n'):
+            line = line[:-1]
+        if removed or added:
+            if line.startswith(b'-'):
+                removed -= 1
+            elif line.startswith(b'+'):
+                hunk.append(line[1:])
+                added -= 1
+                if not added:
+                    yield name, start, hunk
+            # '\ No newline at end of file' isn't counted
+            continue
+        if line.startswith(b'+++ '):
+            # git ends the name with a tab if it has a space in it.  A
+            # name with a tab in it is quoted.
+            path = unquote_path(line[4:].rstrip(b'\t'))
+            name = path.decode('utf-8', errors='surrogateescape')
+        elif line.startswith(b'@@ '):
+            m = hunk_header.match(line)
+            removed = int(m.group(1) or 1)
+            start = int(m.group(2))
+            added = int(m.group(3) or 1)
+            hunk = []
+    process.stdout.close()
+    if process.wait():
+        raise subprocess.CalledProcessError(process.returncode, process.args)
+
+
+def blob_sizes(shas):
+    """The sizes of the blobs shas from one 'git cat-file --batch-check'
+    without reading any of them.  Objects that aren't in the repo (eg the
+    commit of a submodule) are left out."""
+    run_stats.count('subprocesses')
+    r = subprocess.run(['git', 'cat-file', '--batch-check'],
+                       input=''.join(sha + '\n' for sha in shas).encode(),
+                       stdout=subprocess.PIPE)
+    r.check_returncode()
+    sizes = {}
+    for line in r.stdout.decode('ascii').splitlines():
+        # <sha> <type> <size>, or <sha> missing
+        info = line.split()
+        if len(info) == 3 and info[1] == 'blob':
+            sizes[info[0]] = int(info[2])
+    return sizes
+
+
+def check_staged_hunks(lines, args, git_dir):
+    """Check only the lines added by the staged changes.  Files whose
+    check doesn't depend on what changed are still checked whole, as in
+    a full check: gzip files are compressed so their diff says nothing
+    useful and big files must be allowlisted whatever their diff.  Gzip
+    is recognized by content, as in a full check, not by a .gz name."""
+    staged = [(status, name, sha) for status, name, sha in lines
+              if status != 'D' and not content_skipped(name, args)]
+    sizes = blob_sizes(sha for status, name, sha in staged)
+    whole = []
+    with blob_reader() as reader:
+        for status, name, sha in staged:
+            if sizes.get(sha, 0) < md5_whitelist_cutoff \
+               and not name.endswith('.gz'):
+                with reader.open(sha) as f:
+                    if sniff(f.read(2)) != 'gzip':
+                        continue
+            whole.append((status, name, sha))
+    checked = set(name for status, name, sha in staged) \
+        - set(name for status, name, sha in whole)
+
+    for name, start, added in staged_hunks():
+        if name not in checked:
+            continue
+        start_time = time.perf_counter()
+        text = b'\n'.join(added)
+        found = find_blocked_content(io.BytesIO(text))
+        run_stats.file(name, 'hunks', len(text),
+                       time.perf_counter() - start_time)
+        if found:
+            report_blocked_content(name, (start + found[0] - 1, found[1]))
+
+    check_staged_content(whole, args, git_dir)
+
+
+def git_config():
+    """Everything the hook reads from git config (the remote URLs and
+    precommit.*) from a single git process.  Returns a dict from lower
+    case key to the list of its values."""
+    run_stats.count('subprocesses')
+    r = subprocess.run(['git', 'config', '-z', '--get-regexp',
+                        r'^(remote\..*\.(push)?url|precommit\..*)$'],
+                       stdout=subprocess.PIPE)
+    if r.returncode not in (0, 1):  # 1 means no keys matched
+        r.check_returncode()
+    config = {}
+    for entry in r.stdout.decode('utf-8', errors='surrogateescape') \
+                          .split('\0'):
+        if entry:
+            key, _, value = entry.partition('\n')
+            config.setdefault(key, []).append(value)
+    return config
+
+
+def migrate_allowlist():
+    """Print a blob_allowlist entry for every big blob in HEAD whose md5
+    is in the md5_whitelist, ready to paste into this file"""
+    big = []
+    for entry in run_command_z(['git', 'ls-tree', '-r', '-l', '-z', 'HEAD']):
+        info, name = entry.split('\t', 1)
+        mode, kind, sha, size = info.split()
+        if kind == 'blob' and int(size) >= md5_whitelist_cutoff:
+            big.append((name, sha))
+    with blob_reader() as reader:
+        for name, sha in big:
+            with reader.open(sha) as f:
+                md5_hash = stream_md5(f)
+            if md5_hash in md5_whitelist:
+                print("    '{}', # {} (md5 {})".format(sha, name, md5_hash))
+
+
+def check_remotes_secure(config):
+    """Are all the fetch and push URLs of the remotes (from git_config())
+    secure repos?  A repo with no remotes (as in testing) is not."""
+    urls = [url for key, values in config.items() if key.startswith('remote.')
+            for url in values]
+    if not urls:
+        return False
+    # Example url:
+    # /home/zf4_projects/OpenROAD-guest/platforms/gf12.git
+    for url in urls:
+        found = False
+        for repo_pattern in repos_secure:
+            if re.match(repo_pattern, url):
+                found = True
+                break
+        if not found:
+            return False
+    return True
+
+def main(args):
+    # subprocess.run doesn't exist before 3.5
+    if sys.version_info < (3, 5):
+        sys.exit("Python 3.5 or later is required")
+
+    run = collect_violations if args.format else run_checks
+    if args.stats is None:
+        run(args)
+        return
+    # Relative to where we were run from, before any chdir
+    path = output_path(args.stats)
+    # Report even when a check fails
+    run_stats.enabled = True
+    try:
+        run(args)
+    finally:
+        run_stats.write(path)
+
+
+def output_path(path):
+    'path made absolute so it still works after a chdir (- is stdout)'
+    return path if path == '-' else os.path.abspath(path)
+
+
+def collect_violations(args):
+    """Run the checks collecting every violation, write them out in
+    args.format and exit with an error if there were any"""
+    import json
+    global collected_violations
+    path = output_path(args.output)
+    collected_violations = []
+    try:
+        run_checks(args)
+    finally:
+        found, collected_violations = collected_violations, None
+    if args.format == 'sarif':
+        report = sarif_report(found)
+    else:
+        report = found
+    if path == '-':
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+            f.write('\n')
+    if found:
+        sys.exit('\n\nERROR: {} violations found'.format(len(found)))
+
+
+def sarif_report(found):
+    'The violations in found as a SARIF 2.1.0 log for CI annotations'
+    rules = collections.OrderedDict()
+    results = []
+    for v in found:
+        rule_id = '{}/{}'.format(v['kind'], v['rule']) if 'rule' in v \
+            else v['kind']
+        rules.setdefault(rule_id, {'id': rule_id})
+        result = {
+            'ruleId': rule_id,
+            'level': 'error',
+            'message': {'text': v['message']},
+        }
+        if 'file' in v:
+            location = {'artifactLocation': {'uri': v['file']}}
+            if 'line' in v:
+                location['region'] = {'startLine': v['line']}
+            elif 'offset' in v:
+                location['region'] = {'byteOffset': v['offset']}
+            result['locations'] = [{'physicalLocation': location}]
+        results.append(result)
+    return {
+        '$schema': 'https://json.schemastore.org/sarif-2.1.0.json',
+        'version': '2.1.0',
+        'runs': [{
+            'tool': {'driver': {'name': 'pre-commit security hook',
+                                'rules': list(rules.values())}},
+            'results': results,
+        }],
+    }
+
+
+def run_checks(args):
+    # Server side there is no working tree
+    if args.pre_receive:
+        git_dir = run_command('git rev-parse --absolute-git-dir')[0]
+        pre_receive(sys.stdin, args, git_dir)
+        return
+
+    # Make sure this is running from the top level of the repo
+    try:
+        top, git_dir = run_command('git rev-parse --show-toplevel'
+                                   ' --absolute-git-dir')
+    except:
+        error('Not running in git repo: {}'.format(os.getcwd()))
+
+    # Make sure we are running from the root (always true as a hook
+    # but not if run manually)
+    if os.getcwd() != top:
+        print('Running from {}'.format(top))
+        os.chdir(top)
+
+    if args.migrate_allowlist:
+        migrate_allowlist()
+        return
+
+    if args.local:
+        local(top, args, git_dir)
+        return
+
+    if args.range:
+        check_revisions([args.range], args, git_dir)
+        return
+
+    with run_stats.timed('remote check'):
+        config = git_config()
+        secure = check_remotes_secure(config)
+    if secure:
+        print('All git remotes are secure, checking skipped')
+        return
+
+    # Get status and blob of the staged files
+    with run_stats.timed('diff listing'):
+        lines = staged_changes()
+    if not lines:
+        sys.exit('ERROR: Nothing is staged')
+
+    # Newly added files
+    added = [f[1] for f in lines if f[0] == 'A']
+    num_added = len(added)
+
+    # Deleted files
+    deleted = [f[1] for f in lines if f[0] == 'D']
+    num_deleted = len(deleted)
+
+    # This is all other changes, including modify, rename, copy
+    num_changed = len(lines) - num_added - num_deleted
+
+    if (args.report):
+        print("Added {} (limit: {})".format(num_added, file_add_limit))
+        for name in added:
+            print("   ", name)
+        print("Deleted {} (limit: none)".format(num_deleted))
+        for name in deleted:
+            print("   ", name)
+        print("Changed {} (limit: {})".format(num_changed, file_change_limit))
+
+    # Check: num added
+    if num_added > file_add_limit:
+        msg = "too many files added: {} vs limit {}".format(num_added,
+                                                            file_add_limit)
+        violation(msg, 'too-many-added')
+
+    # Check: num changed
+    if num_changed > file_change_limit:
+        msg = "too many files changed: {} vs limit {}".format(num_changed,
+                                                              file_change_limit)
+        violation(msg, 'too-many-changed')
+
+    # Check: blocked files
+    with run_stats.timed('path checks'):
+        for status, name, sha in lines:
+            if is_blocked(name, args):
+                msg = "File name is blocked: {}".format(name)
+                violation(msg, 'blocked-path', name, path_blocked(name))
+
+    # Check: blocked content
+    if hunks_only(args, config):
+        if full_sweep_due(git_dir):
+            print('Running the periodic full check of the tree')
+            local(top, args, git_dir)
+            mark_full_sweep(git_dir)
+        with run_stats.timed('content checks'):
+            check_staged_hunks(lines, args, git_dir)
+    else:
+        with run_stats.timed('content checks'):
+            check_staged_content(lines, args, git_dir)
+
+    if not collected_violations:
+        print("Passed")
+
+
+# The scan daemon listens on this socket in the git dir
+daemon_socket_name = 'pre-commit.sock'
+
+# The scan daemon exits after this many seconds without a request
+daemon_idle_timeout = 8 * 60 * 60
+
+
+def daemon_version():
+    """Identifies this copy of the hook and its rules.  The daemon only
+    answers a client with the same version and exits once this file
+    changes, so it never checks with stale rules."""
+    path = os.path.realpath(__file__)
+    st = os.stat(path)
+    return '{}:{}:{}'.format(path, st.st_mtime_ns, st.st_size)
+
+
+def git_env():
+    'The GIT_ environment variables (eg GIT_INDEX_FILE) of this process'
+    return {k: v for k, v in os.environ.items() if k.startswith('GIT_')}
+
+
+def set_git_env(env):
+    'Replace the GIT_ environment variables of this process with env'
+    for key in list(git_env()):
+        del os.environ[key]
+    os.environ.update(env)
+
+
+def recv_all(sock):
+    'Read from sock until the other end shuts down its side'
+    chunks = []
+    while True:
+        data = sock.recv(65536)
+        if not data:
+            return b''.join(chunks)
+        chunks.append(data)
+
+
+def daemon_client(argv, args):
+    """Hand the checks to the scan daemon if one is running for this
+    repo, print its output and exit as it did.  Returns False having
+    done nothing if there is no daemon or it can't answer, so the checks
+    are run in this process instead.  Git runs the hook from the top of
+    the work tree so the socket is looked for under .git (or $GIT_DIR)
+    without running git."""
+    path = os.path.join(os.environ.get('GIT_DIR', '.git'), daemon_socket_name)
+    try:
+        if not stat.S_ISSOCK(os.stat(path).st_mode):
+            return False
+    except OSError:
+        return False
+    import json
+    import socket
+    request = {'version': daemon_version(), 'cwd': os.getcwd(),
+               'argv': argv, 'env': git_env()}
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(path)
+            sock.sendall(json.dumps(request).encode())
+            sock.shutdown(socket.SHUT_WR)
+            reply = json.loads(recv_all(sock).decode())
+    except (OSError, ValueError):
+        return False
+    if 'exit' not in reply:  # stale or failed
+        return False
+    if args.verbose:
+        print('Checked by the scan daemon (pid {})'.format(reply['pid']))
+    sys.stdout.write(reply['output'])
+    sys.exit(reply['exit'])
+
+
+def serve_request(request, top):
+    """Run the checks a client asked for as if in its own process (its
+    directory, arguments and GIT_ environment) and return the reply: the
+    output and the exit status"""
+    global run_stats
+    run_stats = Stats()
+    saved_env = git_env()
+    set_git_env(request['env'])
+    # The reader sees the objects of the environment it started in
+    env = {k: v for k, v in request['env'].items() if k != 'GIT_INDEX_FILE'}
+    if env != resident.env:
+        resident.reader.close()
+        resident.env = env
+    out = io.StringIO()
+    code = None
+    try:
+        os.chdir(request['cwd'])
+        with contextlib.redirect_stdout(out):
+            try:
+                main(parse_args(request['argv']))
+            except SystemExit as e:
+                code = e.code
+    finally:
+        os.chdir(top)
+        set_git_env(saved_env)
+    if code is not None and not isinstance(code, (int, str)):
+        code = str(code)
+    return {'output': out.getvalue(), 'exit': code, 'pid': os.getpid()}
+
+
+def serve_connection(conn, version, top):
+    """Answer one client.  Returns False once this file has changed and
+    the daemon should exit."""
+    import json
+    import traceback
+    current = daemon_version() == version
+    try:
+        request = json.loads(recv_all(conn).decode())
+        if not current or request.get('version') != version:
+            reply = {'stale': True}
+        else:
+            reply = serve_request(request, top)
+    except Exception:
+        # Let the client check for itself
+        traceback.print_exc()
+        resident.close()
+        reply = {'failed': True}
+    try:
+        conn.sendall(json.dumps(reply).encode())
+    except OSError:
+        pass  # the client gave up
+    return current
+
+
+def serve(args):
+    """Run the scan daemon for the repo we are in until it has been idle
+    for daemon_idle_timeout seconds or this file changes.  Hook runs in
+    the repo hand it their checks over a Unix socket in the git dir so
+    they don't pay to compile the rules, load the scan cache and start
+    git cat-file every commit."""
+    import signal
+    import socket
+    global resident
+    # Clean up on kill as on ^C
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit())
+    try:
+        top, git_dir = run_command('git rev-parse --show-toplevel'
+                                   ' --absolute-git-dir')
+    except:
+        error('Not running in git repo: {}'.format(os.getcwd()))
+    os.chdir(top)
+    path = os.path.join(git_dir, daemon_socket_name)
+    version = daemon_version()
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        server.connect(path)
+        server.close()
+        error('A scan daemon is already running on {}'.format(path))
+    except OSError:
+        pass  # left by one that died
+    with contextlib.suppress(FileNotFoundError):
+        os.unlink(path)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    # Only this user may ask it to run checks
+    umask = os.umask(0o077)
+    try:
+        server.bind(path)
+    finally:
+        os.umask(umask)
+    server.listen(16)
+    server.settimeout(daemon_idle_timeout)
+
+    resident = Resident()
+    for rules in (blocked_path_rules, allowed_path_rules, skip_content_rules):
+        rules.compile()
+    open_scan_cache(git_dir)
+    print('Scan daemon {} listening on {}'.format(os.getpid(), path),
+          flush=True)
+    try:
+        while True:
+            try:
+                conn, _ = server.accept()
+            except socket.timeout:
+                print('Scan daemon idle, exiting')
+                break
+            with conn:
+                conn.settimeout(None)
+                if not serve_connection(conn, version, top):
+                    print('Scan daemon rules changed, exiting')
+                    break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        with contextlib.suppress(OSError):
+            os.unlink(path)
+        resident.close()
+        resident = None
+
+
+def run(argv):
+    'Run the hook as the script argv[0] (eg pre-receive) with its arguments'
+    args = parse_args(argv[1:])
+    if os.path.basename(argv[0]) == 'pre-receive':
+        args.pre_receive = True
+    if args.daemon:
+        serve(args)
+    elif args.pre_receive or args.no_daemon \
+            or not daemon_client(argv[1:], args):
+        main(args)
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+import gzip
+import shutil
+import subprocess
+
+# The diff report of a sync run.  Diffs can be hundreds of MB so they
+# are streamed from git to disk (gzip'd if the file name ends in .gz)
+# a line at a time and never held in memory.  The report starts with an
+# index giving, for each file, the line its diff starts on, the size of
+# its diff and the lines added and deleted, so a reviewer can jump
+# straight to a file (eg less +<line>, or zless for .gz).
+
+# Bytes copied at a time
+block_size = 1024 * 1024
+
+
+def open_report(path, mode):
+    'Open path in binary mode, through gzip if it ends in .gz'
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 'b')
+    return open(path, mode + 'b')
+
+
+def numstat(cwd, old, new):
+    """(added, deleted, name) for each file in git diff old new, in diff
+    order.  Binary files have '-' for added and deleted."""
+    r = subprocess.run(['git', 'diff', '--numstat', '-z', '--no-color',
+                        '--no-ext-diff', old, new], cwd=cwd,
+                       stdout=subprocess.PIPE)
+    r.check_returncode()
+    fields = r.stdout.decode('utf-8', errors='replace').split('\0')
+    stats = []
+    i = 0
+    while i < len(fields) and fields[i]:
+        added, deleted, name = fields[i].split('\t', 2)
+        i += 1
+        if not name:  # a rename: old and new names follow
+            name = '{} => {}'.format(fields[i], fields[i + 1])
+            i += 2
+        stats.append((added, deleted, name))
+    return stats
+
+
+def write_diff(cwd, path, old, new):
+    """Stream git diff old new, run in cwd, into path.  Returns its index,
+    (name, added, deleted, line, size) for each file where line is the
+    line of path its diff starts on and size the bytes of its diff, and
+    the number of lines in path."""
+    stats = numstat(cwd, old, new)
+    starts = []
+    line = 0
+    offset = 0
+    # Not coloured or run through a diff tool whatever the user's config
+    process = subprocess.Popen(['git', 'diff', '--no-color', '--no-ext-diff',
+                                old, new], cwd=cwd, stdout=subprocess.PIPE)
+    with process, open_report(path, 'w') as f:
+        for text in process.stdout:
+            line += 1
+            if text.startswith(b'diff --git '):
+                starts.append((line, offset))
+            f.write(text)
+            offset += len(text)
+    if process.returncode:
+        raise subprocess.CalledProcessError(process.returncode, process.args)
+    if len(stats) != len(starts):
+        # Shouldn't happen, but the diff itself is what matters
+        stats = [('?', '?', '?')] * len(starts)
+    index = []
+    for i, (added, deleted, name) in enumerate(stats):
+        first, start = starts[i]
+        end = starts[i + 1][1] if i + 1 < len(starts) else offset
+        index.append((name, added, deleted, first, end - start))
+    return index, line
+
+
+def count_lines(path):
+    'The number of lines in report path'
+    lines = 0
+    with open_report(path, 'r') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            lines += block.count(b'\n')
+    return lines
+
+
+def write_report(path, title, diffs, append=False):
+    """Write the report of diffs, a list of (repo, diff path, index, lines)
+    from write_diff(), to path: a title line, the index of every file then
+    the diffs in order.  With append they follow what is already in
+    path (a new gzip member for .gz) and the index lines count from the
+    start of the file."""
+    first = count_lines(path) + 1 if append else 1
+    header = [title,
+              '# index: line bytes +added -deleted repo: file',
+              '# {} files'.format(sum(len(d[2]) for d in diffs))]
+    # The diffs start after the header and one index line per file
+    start = first + len(header) + sum(len(d[2]) for d in diffs)
+    lines = []
+    for repo, diff_path, index, diff_lines in diffs:
+        for name, added, deleted, line, size in index:
+            lines.append('{:>10} {:>12} {:>8} {:>8}  {}: {}'.format(
+                start + line - 1, size, '+' + added, '-' + deleted, repo,
+                name))
+        start += diff_lines
+    with open_report(path, 'a' if append else 'w') as f:
+        for text in header + lines:
+            f.write(text.encode('utf-8', errors='replace') + b'\n')
+        for repo, diff_path, index, diff_lines in diffs:
+            with open_report(diff_path, 'r') as diff:
+                shutil.copyfileobj(diff, f, block_size)
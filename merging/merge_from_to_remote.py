@@ -5,6 +5,7 @@ import array as arr
 import argparse
 import os
 import shlex
+import concurrent.futures
 
 # See for recipe to clone repo with all branches to new remote
 # https://gist.github.com/niksumeiko/8972566
@@ -13,6 +14,8 @@ work_dir = os.getcwd()
 path_to_script = os.path.dirname(os.path.realpath(__file__))
 sys.path.append(path_to_script)
 import utils
+import mirror_cache
+import diff_report
 
 
 # Parse and check arguments
@@ -22,6 +25,10 @@ parser.add_argument('--to_remote', dest='to_remote', action='store', help='to /
 parser.add_argument('--repo_names', dest='repo_names', action='store', nargs='+', help='repo names')
 parser.add_argument('--repo_branches', dest='repo_branches', action='store', nargs='+', help='repo branches to copy')
 parser.add_argument('--push', default=False, dest='push', action='store_true', help='after all changes are staged in a first run then push')
+parser.add_argument('--jobs', default=1, dest='jobs', action='store', type=int, help='number of repos to process at once')
+parser.add_argument('--mirror_cache', dest='mirror_cache', action='store', help='directory of bare mirrors kept between runs so clones and fetches only transfer new objects')
+parser.add_argument('--compress', default=False, dest='compress', action='store_true', help='gzip the diff report as it is written')
+parser.add_argument('--prune_cache', dest='prune_cache', action='store', type=int, help='first remove mirrors unused for this many days and gc the rest')
 
 args = parser.parse_args()
 from_remote_prefix = args.from_remote
@@ -38,38 +45,91 @@ repo_branches = args.repo_branches
 
 hooks = utils.run_command_locally("git config --get core.hooksPath").rstrip()
 
+if args.mirror_cache and args.prune_cache is not None:
+    for name in mirror_cache.prune(args.mirror_cache, args.prune_cache):
+        print("pruned mirror", name)
+
 if not push:
     file_name = "diffs-from-" + from_remote_prefix + "-to-" + to_remote_prefix
     file_name = file_name.replace("/","")
     file_name = file_name.replace("\\","")
-    if os.path.exists(file_name):
-        append_write = 'a'
-    else:
-        append_write = 'w'
-    global fp
-    fp = open(file_name, append_write)
-    fp.write(file_name + "\n")
-
-for repo in repo_names:
-    if not push:
-        utils.run_command_locally("git clone " + from_remote_prefix + repo)
-        os.chdir(repo.split(".")[0])
-        # origin is the from_remote, dest is the to remote
-        utils.run_command_locally("git remote add dest " + to_remote_prefix + repo)
-        utils.run_command_locally("git fetch dest master")
-        # in case of submodule merge conflict git merge -s ours dest/master
-    else:
-        os.chdir(repo.split(".")[0])
+    report_name = file_name + ".gz" if args.compress else file_name
+
+# Each repo is processed in its own directory under work_dir with every
+# command run there (no os.chdir) so several can run at once.  The
+# commands and their output go to a log per repo and the diffs to a
+# file per repo, which are merged in --repo_names order at the end.
+def process_repo(repo):
+    repo_dir = os.path.join(work_dir, repo.split(".")[0])
+    log_name = os.path.join(work_dir, "log-" + os.path.basename(repo_dir))
+    with open(log_name, 'w') as log:
+        def run(command, cwd=repo_dir):
+            log.write("$ " + command + "\n")
+            log.flush()
+            subprocess.run(shlex.split(command), cwd=cwd, stdout=log,
+                           stderr=subprocess.STDOUT).check_returncode()
+
+        try:
+            if not push:
+                references = ""
+                if args.mirror_cache:
+                    # Bring the mirrors up to date then borrow their
+                    # objects so the clone and fetch only transfer refs
+                    for url in (from_remote_prefix + repo, to_remote_prefix + repo):
+                        log.write("$ update mirror of " + url + "\n")
+                        log.flush()
+                        mirror = mirror_cache.update_mirror(args.mirror_cache, url, log)
+                        references += " --reference " + shlex.quote(os.path.abspath(mirror))
+                run("git clone" + references + " " + from_remote_prefix + repo, work_dir)
+                # origin is the from_remote, dest is the to remote
+                run("git remote add dest " + to_remote_prefix + repo)
+                run("git fetch dest master")
+                if args.mirror_cache:
+                    # Copy in what was borrowed, as clone --dissociate
+                    # does but after the fetch borrows too, so the
+                    # --push run never depends on the mirrors, which
+                    # prune() gc's
+                    run("git repack -a -d -q")
+                    os.remove(os.path.join(repo_dir, ".git", "objects", "info", "alternates"))
+                # in case of submodule merge conflict git merge -s ours dest/master
 
-    if not push:
-        diffs = utils.run_command_locally("git diff dest/master" + " master")
-        fp.write(diffs)
-        fp.flush()
+            diff = None
+            if not push:
+                # Streamed to disk, the diff can be hundreds of MB
+                diff_name = file_name + "-" + os.path.basename(repo_dir)
+                if args.compress:
+                    diff_name += ".gz"
+                log.write("$ git diff dest/master master > " + diff_name + "\n")
+                log.flush()
+                index, lines = diff_report.write_diff(repo_dir, diff_name, "dest/master", "master")
+                diff = (repo.split(".")[0], diff_name, index, lines)
 
-    utils.run_command_locally("git remote -v")
-    if push:
-        print("{}/pre-commit.py --local".format(hooks))
-        utils.run_command_locally("{}/pre-commit.py --local".format(hooks))
-        utils.run_command_locally("git push dest")
-    os.chdir("..")
+            run("git remote -v")
+            if push:
+                run("{}/pre-commit.py --local".format(hooks))
+                run("git push dest")
+        except (subprocess.CalledProcessError, OSError) as e:
+            log.write(str(e) + "\n")
+            return repo, log_name, None, str(e)
+    return repo, log_name, diff, None
+
+with concurrent.futures.ThreadPoolExecutor(max_workers=max(args.jobs, 1)) as pool:
+    results = list(pool.map(process_repo, repo_names))
+
+# The report and summary are in --repo_names order however the repos
+# finished
+if not push:
+    diffs = [diff for repo, log_name, diff, error in results if diff is not None]
+    diff_report.write_report(report_name, file_name, diffs, append=os.path.exists(report_name))
+    print("diff report", report_name)
+
+failed = 0
+for repo, log_name, diff, error in results:
+    if error is None:
+        print("{}: ok (log {})".format(repo, log_name))
+    else:
+        failed += 1
+        print("{}: FAILED {} (log {})".format(repo, error, log_name))
 
+if failed:
+    sys.exit("{} of {} repos failed".format(failed, len(repo_names)))
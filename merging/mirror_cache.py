@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+import os
+import re
+import shutil
+import subprocess
+import time
+
+# A cache of bare mirrors of the remote repos kept between sync runs.
+# Each run fetches only what is new into the mirrors and clones its
+# working copies with --reference to them, so only new objects cross
+# the network.  Once cloned and fetched the working copies copy in the
+# objects they borrowed and stop using the mirrors, so a mirror can be
+# gc'd or removed without breaking a working copy still waiting to be
+# pushed.
+
+
+def mirror_name(url):
+    'The directory name in the cache of the mirror of url'
+    return re.sub(r'[^A-Za-z0-9._-]', '_', url)
+
+
+def run_git(args, cwd=None, log=None):
+    'Run git with its output going to log (a file) if given'
+    subprocess.run(['git'] + args, cwd=cwd, stdout=log,
+                   stderr=subprocess.STDOUT if log else None).check_returncode()
+
+
+def update_mirror(cache_dir, url, log=None):
+    """Return the path of the bare mirror of url in cache_dir.  It is
+    cloned the first time and only fetched after that."""
+    path = os.path.join(cache_dir, mirror_name(url))
+    if os.path.isdir(path):
+        run_git(['fetch', '--prune', '--quiet', 'origin'], path, log)
+    else:
+        os.makedirs(cache_dir, exist_ok=True)
+        # Cloned under another name so an interrupted clone is never
+        # taken for a mirror
+        tmp = "{}.tmp-{}".format(path, os.getpid())
+        if os.path.exists(tmp):
+            shutil.rmtree(tmp)
+        run_git(['clone', '--mirror', '--quiet', url, tmp], log=log)
+        # Objects a working copy is borrowing must not be gc'd while it
+        # is being cloned, so only prune() gc's
+        run_git(['config', 'gc.auto', '0'], tmp, log)
+        os.rename(tmp, path)
+    # Last used time for prune()
+    os.utime(path)
+    return path
+
+
+def prune(cache_dir, days, log=None):
+    """Remove the mirrors in cache_dir that no run has used for days and
+    gc the rest.  Returns the names of those removed."""
+    removed = []
+    if not os.path.isdir(cache_dir):
+        return removed
+    cutoff = time.time() - days * 24 * 60 * 60
+    for name in sorted(os.listdir(cache_dir)):
+        path = os.path.join(cache_dir, name)
+        if not os.path.isdir(path):
+            continue
+        used = os.path.getmtime(path)
+        if used < cutoff:
+            shutil.rmtree(path)
+            removed.append(name)
+        else:
+            run_git(['gc', '--quiet', '--prune={}.days.ago'.format(days)],
+                    path, log)
+            os.utime(path, (time.time(), used))  # gc isn't a use
+    return removed
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description='Prune the mirror cache used by merge_from_to_remote.py')
+    parser.add_argument('cache_dir', help='mirror cache directory')
+    parser.add_argument('--days', default=30, type=int, help='remove mirrors unused for this many days')
+    args = parser.parse_args()
+    for name in prune(args.cache_dir, args.days):
+        print("removed", name)
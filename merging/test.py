@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+
+import gzip
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+
+import diff_report
+import mirror_cache
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+
+
+def git(*args, cwd=None):
+    'Run git and return its output'
+    return subprocess.run(('git',) + args, cwd=cwd, stdout=subprocess.PIPE,
+                          encoding='utf-8', check=True).stdout
+
+
+def run_sync(area, work, *args):
+    """Run the sync script from the from/ to the to/ remotes in area with
+    args in directory work and return the completed process"""
+    os.makedirs(work)
+    env = dict(os.environ, GIT_CONFIG_COUNT='1',
+               GIT_CONFIG_KEY_0='core.hooksPath',
+               GIT_CONFIG_VALUE_0=os.path.join(script_dir, '..', 'git',
+                                               'hooks'))
+    return subprocess.run([sys.executable,
+                           os.path.join(script_dir, 'merge_from_to_remote.py'),
+                           # file:// to fetch as from a real remote
+                           # rather than copy the objects
+                           '--from_remote', 'file://' + area + '/from/',
+                           '--to_remote', 'file://' + area + '/to/']
+                          + list(args),
+                          cwd=work, env=env, stdout=subprocess.PIPE,
+                          stderr=subprocess.PIPE, encoding='utf-8')
+
+
+class TestMirrorCache(unittest.TestCase):
+    def setUp(self):
+        'Local bare repos stand in for the from and to remotes'
+        self.cwd = os.getcwd()
+        self.area = tempfile.mkdtemp(prefix='mirror-cache-test-')
+        os.chdir(self.area)
+        for remote in ('from', 'to'):
+            os.mkdir(remote)
+            git('init', '-q', '--bare', '--initial-branch=master',
+                os.path.join(remote, 'R.git'))
+        git('init', '-q', 'upstream')
+        git('remote', 'add', 'origin', '../from/R.git', cwd='upstream')
+        self.commit('first')
+        git('push', '-q', '../to/R.git', 'HEAD:master', cwd='upstream')
+        self.commit('second')
+        self.cache = os.path.join(self.area, 'cache')
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.area)
+
+    ## Helpers ##
+    def commit(self, content):
+        'Commit a change to the from remote'
+        with open(os.path.join('upstream', 'f'), 'a') as f:
+            print(content, file=f)
+        git('add', 'f', cwd='upstream')
+        git('commit', '-q', '-m', content, cwd='upstream')
+        git('push', '-q', 'origin', 'HEAD:master', cwd='upstream')
+        return git('rev-parse', 'HEAD', cwd='upstream').strip()
+
+    def sync(self, work):
+        'Run the sync script with the mirror cache in directory work'
+        r = run_sync(self.area, work, '--repo_names', 'R.git',
+                     '--mirror_cache', self.cache)
+        self.assertEqual(r.returncode, 0, r.stdout + r.stderr)
+        return os.path.join(work, 'R')
+
+    ## Tests ##
+    def test_mirror_fetches_new_commits(self):
+        mirror = mirror_cache.update_mirror(self.cache, 'from/R.git')
+        self.assertEqual(os.path.basename(mirror), 'from_R.git')
+        new = self.commit('third')
+        self.assertEqual(mirror_cache.update_mirror(self.cache, 'from/R.git'),
+                         mirror)
+        self.assertEqual(git('rev-parse', 'master', cwd=mirror).strip(), new)
+
+    def test_sync_borrows_objects_from_mirrors(self):
+        repo = self.sync('work1')
+        with open(os.path.join('work1', 'log-R')) as f:
+            self.assertEqual(f.read().count('--reference'), 2)
+        # what was borrowed is copied in so the mirrors can go
+        self.assertFalse(os.path.exists(os.path.join(
+            repo, '.git', 'objects', 'info', 'alternates')))
+        shutil.rmtree(self.cache)
+        git('fsck', '--no-progress', cwd=repo)
+        self.assertIn('+second', git('diff', 'dest/master', 'master',
+                                     cwd=repo))
+
+        # the next run sees new commits
+        new = self.commit('third')
+        repo = self.sync('work2')
+        self.assertEqual(git('rev-parse', 'master', cwd=repo).strip(), new)
+
+    def test_prune_unused_mirrors(self):
+        old = mirror_cache.update_mirror(self.cache, 'from/R.git')
+        used = mirror_cache.update_mirror(self.cache, 'to/R.git')
+        month_ago = time.time() - 31 * 24 * 60 * 60
+        os.utime(old, (month_ago, month_ago))
+        self.assertEqual(mirror_cache.prune(self.cache, 30), ['from_R.git'])
+        self.assertFalse(os.path.exists(old))
+        self.assertTrue(os.path.exists(used))
+
+
+class TestConcurrentSync(unittest.TestCase):
+    def setUp(self):
+        """Local bare from and to remotes for each of repos, each with a
+        commit in from that isn't in to"""
+        self.cwd = os.getcwd()
+        self.area = tempfile.mkdtemp(prefix='concurrent-sync-test-')
+        os.chdir(self.area)
+        self.repos = ['C', 'A', 'B']
+        for repo in self.repos:
+            for remote in ('from', 'to'):
+                git('init', '-q', '--bare', '--initial-branch=master',
+                    os.path.join(remote, repo + '.git'))
+            upstream = 'upstream-' + repo
+            git('init', '-q', upstream)
+            for content in ('first', 'second'):
+                with open(os.path.join(upstream, repo), 'a') as f:
+                    print(content, file=f)
+                git('add', repo, cwd=upstream)
+                git('commit', '-q', '-m', content, cwd=upstream)
+                git('push', '-q', '../from/{}.git'.format(repo),
+                    'HEAD:master', cwd=upstream)
+                if content == 'first':
+                    git('push', '-q', '../to/{}.git'.format(repo),
+                        'HEAD:master', cwd=upstream)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.area)
+
+    ## Tests ##
+    def test_jobs_keep_repo_order_and_carry_on_after_failure(self):
+        names = ['C.git', 'Missing.git', 'A.git', 'B.git']
+        r = run_sync(self.area, 'work', '--jobs', '2', '--repo_names', *names)
+        self.assertNotEqual(r.returncode, 0)
+        self.assertIn('1 of 4 repos failed', r.stderr)
+
+        summary = [line for line in r.stdout.splitlines()
+                   if line.startswith(tuple(names))]
+        self.assertEqual([line.split(':')[0] for line in summary], names)
+        self.assertIn('Missing.git: FAILED', summary[1])
+        for repo in self.repos:
+            self.assertIn('{}.git: ok'.format(repo), r.stdout)
+
+        # each repo logs to its own file
+        for repo in self.repos + ['Missing']:
+            with open(os.path.join('work', 'log-' + repo)) as f:
+                clones = [line for line in f if line.startswith('$ git clone')]
+            self.assertEqual(len(clones), 1)
+            self.assertTrue(clones[0].rstrip().endswith('/{}.git'
+                                                        .format(repo)))
+
+        # the report has the diffs of the repos that worked in order
+        report, = [line.split(None, 2)[2] for line in r.stdout.splitlines()
+                   if line.startswith('diff report ')]
+        with open(os.path.join('work', report)) as f:
+            lines = f.read().splitlines()
+        self.assertEqual(lines[2], '# 3 files')
+        self.assertEqual([line.split()[4:] for line in lines[3:6]],
+                         [[repo + ':', repo] for repo in self.repos])
+        diffs = [line for line in lines
+                 if line.startswith(('diff --git', '+second'))]
+        self.assertEqual(diffs, [line.format(repo) for repo in self.repos
+                                 for line in ('diff --git a/{0} b/{0}',
+                                              '+second')])
+
+
+class TestDiffReport(unittest.TestCase):
+    def setUp(self):
+        'A repo with two commits to diff'
+        self.cwd = os.getcwd()
+        self.area = tempfile.mkdtemp(prefix='diff-report-test-')
+        os.chdir(self.area)
+        git('init', '-q', 'r')
+        self.write('a', 'one\n')
+        self.write('b c', 'x\n' * 10)
+        git('add', '.', cwd='r')
+        git('commit', '-q', '-m', 'old', cwd='r')
+        self.write('a', 'one\ntwo\n')
+        os.remove(os.path.join('r', 'b c'))
+        self.write('d', 'new\n')
+        git('add', '-A', cwd='r')
+        git('commit', '-q', '-m', 'new', cwd='r')
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.area)
+
+    ## Helpers ##
+    def write(self, name, content):
+        with open(os.path.join('r', name), 'w') as f:
+            f.write(content)
+
+    def report(self, path, append=False):
+        'Write the report of the diff to path and return its lines'
+        diff_path = 'diff' + os.path.splitext(path)[1]
+        index, lines = diff_report.write_diff('r', diff_path, 'HEAD~', 'HEAD')
+        diff_report.write_report(path, 'title', [('r', diff_path, index, lines)],
+                                 append)
+        with diff_report.open_report(path, 'r') as f:
+            return f.read().decode().splitlines()
+
+    def check_index(self, lines, first):
+        'The index starting at line first points at each file'
+        entries = [line.split(None, 4) for line in lines[first + 3:first + 6]]
+        self.assertEqual([e[4] for e in entries], ['r: a', 'r: b c', 'r: d'])
+        self.assertEqual([(e[2], e[3]) for e in entries],
+                         [('+1', '-0'), ('+0', '-10'), ('+1', '-0')])
+        for line, size, added, deleted, name in entries:
+            self.assertEqual(lines[int(line) - 1],
+                             'diff --git a/{0} b/{0}'.format(name[3:]))
+        self.assertEqual(sum(int(e[1]) for e in entries),
+                         sum(len(line) + 1 for line in lines[first + 6:]))
+
+    ## Tests ##
+    def test_index_points_at_files(self):
+        lines = self.report('report')
+        self.assertEqual(lines[0], 'title')
+        self.assertEqual(lines[2], '# 3 files')
+        self.check_index(lines, 0)
+
+    def test_index_ignores_color_config(self):
+        git('config', 'color.diff', 'always', cwd='r')
+        self.check_index(self.report('report'), 0)
+
+    def test_compressed_and_appended(self):
+        first = self.report('report.gz')
+        with gzip.open('diff.gz') as f:
+            self.assertTrue(f.read().startswith(b'diff --git a/a b/a'))
+        lines = self.report('report.gz', append=True)
+        self.assertEqual(lines[:len(first)], first)
+        self.check_index(lines, len(first))
+
+
+if __name__ == '__main__':
+    unittest.main()